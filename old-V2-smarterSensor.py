@@ -1,95 +1,170 @@
 import time
 import RPi.GPIO as GPIO
 import mysql.connector
-import schedule
 import datetime
+import atexit
+import threading
 
-# Pin of Input
-GPIOpin = -1
+# headID of this header in heading_data
+HEADER_ID = 3
 
-# Initial the input pin
-def initialInductive(pin):
-  global GPIOpin
-  global mysqli
-  global mycursor
-  GPIOpin = pin
-  GPIO.setmode(GPIO.BCM)
-  GPIO.setup(GPIOpin,GPIO.IN, pull_up_down=GPIO.PUD_DOWN)
-  print("Finished GPIO Initiation")
-  mysqli=mysql.connector.connect(
-    host='192.168.1.54',
-    user='webapp',
-    password='STUDS2650',
-    database='iwt_db')
-  mycursor = mysqli.cursor()
-  print("Finished mySQLi Initiation")
+# How often (seconds) the status and count jobs run
+STATUS_INTERVAL = 60
+DATA_INTERVAL = 30 * 60
 
-# Detect Metal
-def detectMetal():
-   global oldState
-   global count
-   global status
-   if(GPIOpin != -1):
-     newState = GPIO.input(GPIOpin)
-     if newState != oldState:
-       if newState==1:
-         count+=1
-         print(count)
-         oldState=newState
-         status = 'ACTIVE'
-       else:
-         oldState=newState
-     else:
-       status = 'INACTIVE'
-   else:
-     print("Please Initial Input Ports")
+# Status is resent at least this often (seconds) even when unchanged
+STATUS_HEARTBEAT = 600
 
-#sendUpTime
-def sendStatus():
-  global mysqli
-  global mycursor
-  global status
-  sql = "UPDATE heading_data SET headStatus = %s WHERE headID = %s"
-  val = (status, '3')
-  mycursor.execute(sql,val)
-  mysqli.commit()
-  print("Header Status Updated")
+# Most count rows kept in memory while the database is unreachable
+MAX_PENDING_ROWS = 1000
 
+class Sensor:
+  __slots__ = ("pin", "count", "oldState", "upTime", "downTime", "stateEnterTime",
+               "status", "lastStatus", "lastStatusTime", "pendingRows",
+               "db", "cur", "statusCur", "countLock")
 
-#sendData
-def sendData():
-  global count
-  global mysqli
-  global mycursor
-  global upTime
-  global downTime
-  x = datetime.datetime.now()
-  myDate = x.strftime("%x")
-  myHour = x.strftime("%H")
-  myMin = x.strftime("%M")
-  sql = "INSERT INTO heading_rates (headName, studCount, updateFullDate, updateDate, updateHour, updateMinute) VALUES (%s, %s, %s, %s, %s, %s)"
-  val = ("NATIONAL_2", count, x, myDate, myHour, myMin)
-  mycursor.execute(sql,val)
-  mysqli.commit()
-  print("Count Record Inserted")
-  count = 0
+  def __init__(self, pin):
+    self.pin = pin
+    self.count = -1
+    self.oldState = 2
+    # Seconds spent with metal present / absent, from monotonic timestamps
+    self.upTime = 0
+    self.downTime = 0
+    self.stateEnterTime = time.monotonic()
+    self.status = 'INACTIVE'
+    # Last status written to heading_data
+    self.lastStatus = None
+    self.lastStatusTime = 0
+    # Count rows waiting to be inserted into heading_rates
+    self.pendingRows = []
+    self.db = None
+    self.cur = None
+    self.statusCur = None
+    # Guards count, status and the up/down timing between the edge callback
+    # and the send jobs
+    self.countLock = threading.Lock()
+
+  # Initial the input pin
+  def initialInductive(self):
+    GPIO.setmode(GPIO.BCM)
+    GPIO.setup(self.pin,GPIO.IN, pull_up_down=GPIO.PUD_DOWN)
+    # Let the kernel wake us on a real edge instead of polling the pin
+    GPIO.add_event_detect(self.pin, GPIO.BOTH, callback=self.detectMetal, bouncetime=2)
+    print("Finished GPIO Initiation")
+    self.db=mysql.connector.connect(
+      host='192.168.1.54',
+      user='webapp',
+      password='STUDS2650',
+      database='iwt_db',
+      connection_timeout=5,
+      autocommit=True,
+      use_pure=False)
+    self.cur = self.db.cursor()
+    # Status UPDATE is parsed once by the server and re-executed every minute
+    self.statusCur = self.db.cursor(prepared=True)
+    print("Finished mySQLi Initiation")
+
+  # Reconnect if the server dropped us since the last query
+  def checkConnection(self):
+    connectionId = self.db.connection_id
+    self.db.ping(reconnect=True, attempts=3, delay=1)
+    # Prepared statements don't survive a reconnect
+    if self.db.connection_id != connectionId:
+      self.statusCur = self.db.cursor(prepared=True)
+
+  # Detect Metal (GPIO edge callback)
+  def detectMetal(self, channel):
+    newState = GPIO.input(channel)
+    if newState != self.oldState:
+      with self.countLock:
+        # Credit the time spent in the state we are leaving
+        now = time.monotonic()
+        if self.oldState==1:
+          self.upTime += now - self.stateEnterTime
+        else:
+          self.downTime += now - self.stateEnterTime
+        self.stateEnterTime = now
+        if newState==1:
+          self.count+=1
+          print(self.count)
+          self.status = 'ACTIVE'
+        self.oldState=newState
+
+  #sendUpTime
+  def sendStatus(self):
+    # Report ACTIVE again only if a part is detected before the next update
+    with self.countLock:
+      currentStatus = self.status
+      self.status = 'INACTIVE'
+    now = time.monotonic()
+    if currentStatus == self.lastStatus and now - self.lastStatusTime < STATUS_HEARTBEAT:
+      return
+    sql = "UPDATE heading_data SET headStatus = %s WHERE headID = %s"
+    val = (currentStatus, HEADER_ID)
+    try:
+      self.checkConnection()
+      self.statusCur.execute(sql,val)
+      self.lastStatus = currentStatus
+      self.lastStatusTime = now
+      print("Header Status Updated")
+    except mysql.connector.Error as err:
+      print(f"Header Status Update Failed: {err}")
+
+  #sendData
+  def sendData(self):
+    x = datetime.datetime.now()
+    myDate = x.strftime("%x")
+    myHour = f"{x.hour:02d}"
+    myMin = f"{x.minute:02d}"
+    # Take the totals and reset them in one step so no edge is lost in between
+    with self.countLock:
+      # Credit the time spent so far in the state the machine is still in
+      now = time.monotonic()
+      if self.oldState==1:
+        self.upTime += now - self.stateEnterTime
+      else:
+        self.downTime += now - self.stateEnterTime
+      self.stateEnterTime = now
+      sentCount, upTime, downTime = self.count, self.upTime, self.downTime
+      self.count = 0
+      self.upTime = 0
+      self.downTime = 0
+    self.pendingRows.append(("NATIONAL_2", sentCount, x, myDate, myHour, myMin))
+    print(f"Up {upTime:.0f}s / Down {downTime:.0f}s since last send")
+    self.flushData()
+
+  #flushData
+  def flushData(self):
+    if not self.pendingRows:
+      return
+    sql = "INSERT INTO heading_rates (headName, studCount, updateFullDate, updateDate, updateHour, updateMinute) VALUES (%s, %s, %s, %s, %s, %s)"
+    try:
+      self.checkConnection()
+      # One round-trip for every buffered row
+      self.cur.executemany(sql,self.pendingRows)
+      self.db.commit()
+      print(f"{len(self.pendingRows)} Count Record(s) Inserted")
+      self.pendingRows = []
+    except mysql.connector.Error as err:
+      # Keep the rows for the next send, dropping the oldest past the cap
+      self.pendingRows = self.pendingRows[-MAX_PENDING_ROWS:]
+      print(f"Count Insert Failed, {len(self.pendingRows)} Record(s) Pending: {err}")
 
 # test module
 if __name__ == '__main__':
-  pin = 17
-  count = -1
-  upTime = -1
-  downTime = -1
-  mysqli = 'mysqli'
-  mycursor = 'mycursor'
-  status = 'INACTIVE'
-  initialInductive(pin)
-  oldState = 2
-  schedule.every(30).minutes.do(sendData)
-  schedule.every(1).minutes.do(sendStatus)
+  sensor = Sensor(17)
+  sensor.initialInductive()
+  atexit.register(sensor.flushData)
   print("Count Sequence Started")
+  nextStatus = time.monotonic() + STATUS_INTERVAL
+  nextData = time.monotonic() + DATA_INTERVAL
   while True:
-    detectMetal()
-    schedule.run_pending()
-
-
+    # Sleep until the next job is due; counting happens in detectMetal
+    time.sleep(max(0, min(nextStatus, nextData) - time.monotonic()))
+    now = time.monotonic()
+    if now >= nextStatus:
+      sensor.sendStatus()
+      nextStatus += STATUS_INTERVAL
+    if now >= nextData:
+      sensor.sendData()
+      nextData += DATA_INTERVAL
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Shared SH1106 driver for the Waveshare 1.3" OLED HAT display scripts
+Import PartialSH1106 from here instead of copying it into each script
+"""
+
+from luma.oled.device import sh1106
+from PIL import Image
+
+# luma only checks this is a speed it allows and never probes the panel, so
+# stay at the rate the HAT has run at rather than a faster, untested one
+SPI_SPEED_HZ = 8000000
+
+# Reverses the bit order of a byte (PIL packs MSB-first, SH1106 pages are LSB-top)
+_BIT_REVERSE = bytes(int(f"{i:08b}"[::-1], 2) for i in range(256))
+
+class PartialSH1106(sh1106):
+    """SH1106 that only sends the columns of each page that changed since the last frame"""
+    
+    # Unchanged bytes between two dirty runs that are cheaper to resend than
+    # to skip with another 3-byte address command
+    MAX_GAP = 4
+    
+    def __init__(self, serial_interface, **kwargs):
+        # Set before sh1106.__init__, which clears the screen through display()
+        self._prev_pages = {}
+        super().__init__(serial_interface, **kwargs)
+    
+    def display(self, image):
+        assert(image.mode == self.mode)
+        assert(image.size == self.size)
+        image = self.preprocess(image)
+        
+        # Transposed, each row of 8 bytes is one column; byte N is page N
+        raw = image.transpose(Image.TRANSPOSE).tobytes()
+        for page in range(self._pages):
+            data = raw[page::8].translate(_BIT_REVERSE)
+            prev = self._prev_pages.get(page)
+            if data == prev:
+                continue
+            
+            if prev is None:
+                runs = [(0, self.width - 1)]
+            else:
+                runs = []
+                for x in range(self.width):
+                    if data[x] == prev[x]:
+                        continue
+                    if runs and x - runs[-1][1] - 1 <= self.MAX_GAP:
+                        runs[-1] = (runs[-1][0], x)
+                    else:
+                        runs.append((x, x))
+            
+            for start, end in runs:
+                column = start + 2  # SH1106 RAM is 132 wide, panel starts at column 2
+                self.command(0xB0 | page, column & 0x0F, 0x10 | (column >> 4))
+                # spidev's writebytes and writebytes2 both take bytes as-is
+                self.data(data[start:end + 1])
+            self._prev_pages[page] = data
@@ -5,27 +5,34 @@ import mysql.connector
 import schedule
 import datetime
 import os
+import threading
 
 # Pin of Input
 GPIOpin = -1
 
+# Guards count between the edge callback and sendData
+countLock = threading.Lock()
+
 # Initial the input pin
 def initialInductive(pin):
   global GPIOpin
   GPIOpin = pin
   GPIO.setmode(GPIO.BCM)
   GPIO.setup(GPIOpin,GPIO.IN, pull_up_down=GPIO.PUD_DOWN)
+  # Registered once, so edges stay queued by the kernel while detectMetal runs
+  GPIO.add_event_detect(GPIOpin, GPIO.BOTH, callback=detectMetal)
   print("Finished Initiation")
 
-# Detect Metal
-def detectMetal():
+# Detect Metal (GPIO edge callback)
+def detectMetal(channel=None):
    global oldState
    global count
    if(GPIOpin != -1):
      newState = GPIO.input(GPIOpin)
      if newState != oldState:
        if newState==1:
-         count+=1
+         with countLock:
+           count+=1
          print(count)
          oldState=newState
        else:
@@ -49,16 +56,18 @@ def sendData():
   if myHour>=7 and myHour<=17:
     mycursor=mysqli.cursor()
     sql = "INSERT INTO heading_rates (headName, studCount, updateFullDate, updateDate, updateHour, updateMinute) VALUES (%s, %s, %s, %s, %s, %s)"
-    val = ("NATIONAL_1", count, x, myDate, myHour, myMin)
+    with countLock:
+      sentCount = count
+      count = 0
+    val = ("NATIONAL_1", sentCount, x, myDate, myHour, myMin)
     mycursor.execute(sql,val)
     mysqli.commit()
-    if count>0:
+    if sentCount>0:
       sql2 = "UPDATE heading_data SET headStatus = 'ACTIVE' WHERE headID = 1"
     else:
       sql2 = "UPDATE heading_data SET headStatus = 'INACTIVE' WHERE headID = 1"
     mycursor.execute(sql2)
     mysqli.commit()
-    count = 0
     print('Data Sent')
   if myHour==23 and myMin==59:
     os.system('sudo reboot')
@@ -80,5 +89,5 @@ if __name__ == '__main__':
   initialInductive(pin)
   schedule.every(1).minutes.do(sendData)
   while True:
-    detectMetal()
     schedule.run_pending()
+    time.sleep(max(1, schedule.idle_seconds() or 1))
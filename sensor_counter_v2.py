@@ -27,6 +27,7 @@ try:
     from luma.core.interface.serial import spi
     from luma.core.render import canvas
     from luma.oled.device import sh1106
+    from oled_display import SPI_SPEED_HZ
     from PIL import ImageFont, Image, ImageDraw
 except ImportError as e:
     print(f"Error importing required libraries: {e}")
@@ -266,7 +267,7 @@ class SensorCounter:
         """Initialize OLED display"""
         print("Initializing display (SH1106, 4-wire SPI)...")
         try:
-            serial = spi(device=0, port=0, bus_speed_hz=8000000, 
+            serial = spi(device=0, port=0, bus_speed_hz=SPI_SPEED_HZ, 
                         dc_pin=DC_PIN, rst_pin=RST_PIN)
             self.device = sh1106(serial, rotate=2)
             print(f"✓ Display initialized: {self.device.width}x{self.device.height}")
@@ -11,7 +11,7 @@ import json
 import threading
 from enum import Enum
 from dataclasses import dataclass
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
 
 # Display and input libraries (will need to be installed)
 # from luma.oled.device import ssd1306
@@ -32,14 +32,6 @@ class ConnectionStatus(Enum):
     RECONNECTING = "reconnecting"
     ERROR = "error"
 
-@dataclass
-class CountRecord:
-    """Structure for storing count data in offline queue"""
-    timestamp: datetime.datetime
-    count: int
-    uploaded: bool = False
-    retry_count: int = 0
-
 @dataclass
 class SystemState:
     """Current state of the sensor system"""
@@ -74,15 +66,28 @@ class DatabaseManager:
         self.last_connection_attempt = None
         self.retry_delay = 30  # Start with 30 second retry delay
         self.max_retry_delay = 300  # Max 5 minute delay
+        # Sync thread and button callbacks share one connection
+        self.lock = threading.Lock()
         
     def connect(self) -> bool:
         """Attempt to connect to MySQL database"""
+        # Release the old (usually dead) connection before replacing it;
+        # under the lock so no other thread is mid-query on it
+        with self.lock:
+            if self.connection:
+                try:
+                    self.connection.close()
+                except mysql.connector.Error:
+                    pass
+                self.connection = None
+        
         try:
             self.connection = mysql.connector.connect(
                 host=self.config['host'],
                 user=self.config['user'],
                 password=self.config['password'],
-                database=self.config['database']
+                database=self.config['database'],
+                autocommit=True  # Single-row writes, no extra COMMIT round-trip
             )
             self.retry_delay = 30  # Reset retry delay on successful connection
             return True
@@ -92,38 +97,73 @@ class DatabaseManager:
             return False
     
     def is_connected(self) -> bool:
-        """Check if database connection is active"""
+        """Check if database connection is active (sync loop heartbeat only)"""
         if not self.connection:
             return False
         try:
-            self.connection.ping(reconnect=False)
+            with self.lock:
+                self.connection.ping(reconnect=False)
             return True
         except:
             return False
     
     def execute_query(self, query: str, params: tuple = None) -> Optional[Any]:
         """Execute a database query with error handling"""
-        if not self.is_connected():
+        if not self.connection:
             if not self.connect():
                 return None
-                
-        try:
-            cursor = self.connection.cursor()
-            cursor.execute(query, params or ())
-            
-            if query.strip().upper().startswith('SELECT'):
-                result = cursor.fetchall()
-                cursor.close()
-                return result
-            else:
-                self.connection.commit()
-                cursor.close()
-                return True
-                
-        except mysql.connector.Error as e:
-            print(f"Query execution failed: {e}")
-            return None
+        
+        # No ping up front - a dead connection shows up as a failed query,
+        # which is retried once on a fresh connection
+        for attempt in range(2):
+            try:
+                with self.lock:
+                    cursor = self.connection.cursor()
+                    try:
+                        cursor.execute(query, params or ())
+                        
+                        if query.strip().upper().startswith('SELECT'):
+                            return cursor.fetchall()
+                        return True
+                    finally:
+                        cursor.close()
+                    
+            except (mysql.connector.errors.OperationalError,
+                    mysql.connector.errors.InterfaceError) as e:
+                print(f"Query execution failed, connection lost: {e}")
+                if attempt or not self.connect():
+                    return None
+                    
+            except mysql.connector.Error as e:
+                print(f"Query execution failed: {e}")
+                return None
     
+    def execute_many(self, query: str, rows: List[tuple]) -> bool:
+        """Execute a write query for many parameter rows in one batch"""
+        if not self.connection:
+            if not self.connect():
+                return False
+        
+        for attempt in range(2):
+            try:
+                with self.lock:
+                    cursor = self.connection.cursor()
+                    try:
+                        cursor.executemany(query, rows)
+                        return True
+                    finally:
+                        cursor.close()
+            
+            except (mysql.connector.errors.OperationalError,
+                    mysql.connector.errors.InterfaceError) as e:
+                print(f"Batch execution failed, connection lost: {e}")
+                if attempt or not self.connect():
+                    return False
+            
+            except mysql.connector.Error as e:
+                print(f"Batch execution failed: {e}")
+                return False
+
     def get_current_counts(self, head_name: str) -> Dict[str, int]:
         """Get current confirmed and unconfirmed counts from database"""
         # Get confirmed count from heading_data
@@ -166,11 +206,25 @@ class DatabaseManager:
             (headName, studCount, updateFullDate, updateDate, updateHour, updateMinute) 
             VALUES (%s, %s, %s, %s, %s, %s)
         """
-        params = (head_name, count, now, now.strftime("%x"), now.hour, now.minute)
+        params = (head_name, count, now, f"{now:%m/%d/%y}", now.hour, now.minute)
         
         result = self.execute_query(query, params)
         return result is not None
     
+    def upload_count_data_bulk(self, head_name: str, counts: List[int]) -> bool:
+        """Upload several count records to heading_rates in one batch"""
+        # One timestamp for the whole batch - formatted once, not per row
+        now = datetime.datetime.now()
+        date_str = f"{now:%m/%d/%y}"
+        query = """
+            INSERT INTO heading_rates 
+            (headName, studCount, updateFullDate, updateDate, updateHour, updateMinute) 
+            VALUES (%s, %s, %s, %s, %s, %s)
+        """
+        rows = [(head_name, count, now, date_str, now.hour, now.minute) for count in counts]
+        
+        return self.execute_many(query, rows)
+
     def confirm_counts(self, head_name: str, new_count: int, user: str = "PI_SENSOR") -> bool:
         """Execute full confirmation workflow - move unconfirmed to confirmed"""
         now = datetime.datetime.now()
@@ -183,8 +237,6 @@ class DatabaseManager:
             WHERE hea.headName = %s
         """
         
-        result = self.execute_query(update_query, (new_count, now, head_name))
-        
         # Also update header status based on activity
         status_query = """
             UPDATE heading_data 
@@ -192,102 +244,129 @@ class DatabaseManager:
             WHERE headName = %s
         """
         status = 'ACTIVE' if new_count > 0 else 'INACTIVE'
-        self.execute_query(status_query, (status, head_name))
         
-        return result is not None
+        if not self.connection:
+            if not self.connect():
+                return False
+        
+        # Both updates go in one transaction so the confirmed count and
+        # header status never diverge; like execute_query, a lost connection
+        # is retried once on a fresh one
+        for attempt in range(2):
+            try:
+                with self.lock:
+                    cursor = self.connection.cursor()
+                    try:
+                        self.connection.start_transaction()
+                        cursor.execute(update_query, (new_count, now, head_name))
+                        cursor.execute(status_query, (status, head_name))
+                        self.connection.commit()
+                        return True
+                    except mysql.connector.Error:
+                        try:
+                            self.connection.rollback()
+                        except mysql.connector.Error:
+                            pass
+                        raise
+                    finally:
+                        cursor.close()
+                
+            except (mysql.connector.errors.OperationalError,
+                    mysql.connector.errors.InterfaceError) as e:
+                print(f"Count confirmation failed, connection lost: {e}")
+                if attempt or not self.connect():
+                    return False
+                
+            except mysql.connector.Error as e:
+                print(f"Count confirmation failed: {e}")
+                return False
 
 class OfflineDataManager:
     """Manages local SQLite database for offline data storage"""
     
+    # Applied to the connection once when it is opened. mmap_size serves the
+    # sync loop's reads (pending batch scan and SUM each pass) from a mapped
+    # view of the file; the display thread only renders the state snapshot
+    CONNECTION_PRAGMAS = """
+        PRAGMA journal_mode=WAL;
+        PRAGMA synchronous=NORMAL;
+        PRAGMA mmap_size=67108864;
+    """
+    
     def __init__(self, db_path: str = "/home/pi/sensor_data.db"):
         self.db_path = db_path
+        # One long-lived connection shared by the sync thread and button
+        # callbacks instead of opening/closing the file on every call
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.conn.executescript(self.CONNECTION_PRAGMAS)
+        mmap_size = self.conn.execute("PRAGMA mmap_size").fetchone()
+        print(f"Offline DB mmap_size: {mmap_size[0] if mmap_size else 0} bytes")
         self.init_database()
     
     def init_database(self):
         """Initialize the local SQLite database"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS offline_counts (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                timestamp TEXT NOT NULL,
-                count INTEGER NOT NULL,
-                uploaded BOOLEAN DEFAULT FALSE,
-                retry_count INTEGER DEFAULT 0,
-                created_at TEXT DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-        conn.commit()
-        conn.close()
+        with self.lock:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS offline_counts (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    timestamp TEXT NOT NULL,
+                    count INTEGER NOT NULL,
+                    uploaded BOOLEAN DEFAULT FALSE,
+                    retry_count INTEGER DEFAULT 0,
+                    created_at TEXT DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            self.conn.commit()
     
     def add_count_record(self, count: int) -> bool:
         """Add a count record to local storage"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
             timestamp = datetime.datetime.now().isoformat()
-            cursor.execute("""
-                INSERT INTO offline_counts (timestamp, count)
-                VALUES (?, ?)
-            """, (timestamp, count))
-            
-            conn.commit()
-            conn.close()
+            with self.lock:
+                self.conn.execute("""
+                    INSERT INTO offline_counts (timestamp, count)
+                    VALUES (?, ?)
+                """, (timestamp, count))
+                self.conn.commit()
             return True
             
         except Exception as e:
             print(f"Failed to add count record: {e}")
             return False
     
-    def get_pending_records(self) -> List[CountRecord]:
-        """Get all unuploaded count records"""
+    def get_pending_batch(self) -> Tuple[List[int], List[int]]:
+        """Get (ids, counts) of all unuploaded records for bulk upload"""
+        # Upload path only needs ids and counts - no timestamps to parse
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                SELECT id, timestamp, count, retry_count
-                FROM offline_counts 
-                WHERE uploaded = FALSE
-                ORDER BY timestamp ASC
-            """)
-            
-            records = []
-            for row in cursor.fetchall():
-                record = CountRecord(
-                    timestamp=datetime.datetime.fromisoformat(row[1]),
-                    count=row[2],
-                    uploaded=False,
-                    retry_count=row[3]
-                )
-                record.db_id = row[0]  # Store DB ID for updates
-                records.append(record)
-            
-            conn.close()
-            return records
+            with self.lock:
+                rows = self.conn.execute("""
+                    SELECT id, count
+                    FROM offline_counts 
+                    WHERE uploaded = FALSE
+                    ORDER BY timestamp ASC
+                """).fetchall()
             
+            if not rows:
+                return [], []
+            record_ids, counts = zip(*rows)
+            return list(record_ids), list(counts)
+        
         except Exception as e:
             print(f"Failed to get pending records: {e}")
-            return []
+            return [], []
     
     def mark_uploaded(self, record_ids: List[int]):
         """Mark records as successfully uploaded"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
             placeholders = ','.join('?' * len(record_ids))
-            cursor.execute(f"""
-                UPDATE offline_counts 
-                SET uploaded = TRUE 
-                WHERE id IN ({placeholders})
-            """, record_ids)
-            
-            conn.commit()
-            conn.close()
+            with self.lock:
+                self.conn.execute(f"""
+                    UPDATE offline_counts 
+                    SET uploaded = TRUE 
+                    WHERE id IN ({placeholders})
+                """, record_ids)
+                self.conn.commit()
             
         except Exception as e:
             print(f"Failed to mark records as uploaded: {e}")
@@ -295,17 +374,13 @@ class OfflineDataManager:
     def increment_retry_count(self, record_id: int):
         """Increment retry count for a failed upload"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                UPDATE offline_counts 
-                SET retry_count = retry_count + 1 
-                WHERE id = ?
-            """, (record_id,))
-            
-            conn.commit()
-            conn.close()
+            with self.lock:
+                self.conn.execute("""
+                    UPDATE offline_counts 
+                    SET retry_count = retry_count + 1 
+                    WHERE id = ?
+                """, (record_id,))
+                self.conn.commit()
             
         except Exception as e:
             print(f"Failed to increment retry count: {e}")
@@ -313,33 +388,46 @@ class OfflineDataManager:
     def get_total_pending_count(self) -> int:
         """Get sum of all pending upload counts"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                SELECT SUM(count) FROM offline_counts WHERE uploaded = FALSE
-            """)
-            
-            result = cursor.fetchone()[0]
-            conn.close()
+            with self.lock:
+                result = self.conn.execute("""
+                    SELECT SUM(count) FROM offline_counts WHERE uploaded = FALSE
+                """).fetchone()[0]
             
             return result or 0
             
         except Exception as e:
             print(f"Failed to get total pending count: {e}")
             return 0
+    
+    def close(self):
+        """Close the local database connection"""
+        with self.lock:
+            self.conn.close()
 
 class DisplayManager:
     """Manages OLED display and screen navigation"""
     
+    IP_CACHE_TTL = 60  # Seconds before the cached IP address is re-resolved
+    
     def __init__(self):
         # Initialize OLED display (commented out until hardware is available)
         # self.device = ssd1306(spi(device=0, port=0))
         # self.font = ImageFont.load_default()
-        pass
+        self._ip_cache = (None, 0.0)  # (ip_address, time.monotonic() when resolved)
+        self._last_connection_status = None
     
     def _get_device_ip(self):
-        """Get the device's IP address"""
+        """Get the device's IP address, cached for IP_CACHE_TTL seconds"""
+        ip_address, resolved_at = self._ip_cache
+        if ip_address is not None and time.monotonic() - resolved_at < self.IP_CACHE_TTL:
+            return ip_address
+        
+        ip_address = self._resolve_device_ip()
+        self._ip_cache = (ip_address, time.monotonic())
+        return ip_address
+    
+    def _resolve_device_ip(self):
+        """Look up the device's IP address"""
         import socket
         try:
             # Create a socket connection to determine the local IP
@@ -400,7 +488,11 @@ class DisplayManager:
             ConnectionStatus.ERROR: "⚠ ERROR"
         }
         
-        # Get device IP address
+        # Get device IP address - re-resolve whenever the connection state
+        # changes, since a reconnect often means the network changed
+        if state.connection_status != self._last_connection_status:
+            self._ip_cache = (None, 0.0)
+            self._last_connection_status = state.connection_status
         device_ip = self._get_device_ip()
         
         print(f"\n=== CONNECTION STATUS ===")
@@ -465,6 +557,15 @@ class SensorSystem:
         self.config = config
         self.state = SystemState()
         
+        # Set whenever displayed state changes; wakes the display thread
+        self._dirty = threading.Event()
+        # Set to run a sync pass now instead of waiting for the 30 s heartbeat
+        self._sync_wake = threading.Event()
+        # Button 3 was pressed; the sync thread runs the confirm workflow
+        self._confirm_requested = False
+        # Guards live_count between the sensor edge callback and the sync thread
+        self._count_lock = threading.Lock()
+        
         # Initialize components
         self.db_manager = DatabaseManager(config['database'])
         self.offline_manager = OfflineDataManager()
@@ -473,7 +574,6 @@ class SensorSystem:
         
         # Sensor setup
         self.sensor_pin = config.get('sensor_pin', 17)
-        self.old_state = 2  # Initialize to impossible state to catch first reading
         self.setup_sensor()
         
         # Threading for background tasks
@@ -487,60 +587,73 @@ class SensorSystem:
         """Initialize the inductive sensor GPIO"""
         GPIO.setmode(GPIO.BCM)
         GPIO.setup(self.sensor_pin, GPIO.IN, pull_up_down=GPIO.PUD_DOWN)
+        # Count on the kernel-detected rising edge instead of sampling the pin;
+        # the short lockout absorbs sensor bounce on the leading edge. Button
+        # callbacks share this thread, so none of them may block on the database
+        GPIO.add_event_detect(self.sensor_pin, GPIO.RISING, callback=self.detect_metal, bouncetime=2)
         print(f"Sensor initialized on pin {self.sensor_pin}")
     
-    def detect_metal(self):
-        """Check for metal detection and update counts"""
+    def detect_metal(self, channel):
+        """Metal detected (rising edge callback) - update counts"""
+        # Runs once per part, so keep it minimal - no console output here
         if self.state.counting_paused:
             return
-            
-        new_state = GPIO.input(self.sensor_pin)
         
-        if new_state != self.old_state:
-            if new_state == 1:  # Metal detected (rising edge)
-                self.state.live_count += 1
-                self.state.last_detection_time = datetime.datetime.now()
-                print(f"Metal detected! Live count: {self.state.live_count}")
-            self.old_state = new_state
+        with self._count_lock:
+            self.state.live_count += 1
+        self.state.last_detection_time = datetime.datetime.now()
+        self._dirty.set()
     
     def toggle_pause(self):
         """Toggle counting pause state (Button 1)"""
         self.state.counting_paused = not self.state.counting_paused
+        self._dirty.set()
         status = "PAUSED" if self.state.counting_paused else "RESUMED"
         print(f"Counting {status}")
     
     def reset_count(self):
         """Reset live count (Button 2)"""
-        self.state.live_count = 0
+        with self._count_lock:
+            self.state.live_count = 0
+        self._dirty.set()
         print("Live count reset to 0")
     
     def confirm_count(self):
-        """Confirm current counts - full workflow (Button 3)"""
-        if self.state.live_count == 0:
+        """Confirm current counts (Button 3) - queued to the sync thread"""
+        # The database work can block for seconds, which would stall the
+        # GPIO callback thread and delay sensor edges behind it
+        self._confirm_requested = True
+        self._sync_wake.set()
+    
+    def _run_confirm(self):
+        """Confirm current counts - full workflow (runs on the sync thread)"""
+        # Parts counted while the confirm is in flight stay in live_count
+        with self._count_lock:
+            confirming = self.state.live_count
+            new_total = self.state.total_unconfirmed_count
+        if confirming == 0:
             print("No live count to confirm")
             return
             
-        print(f"Confirming {self.state.live_count} counts...")
+        print(f"Confirming {confirming} counts...")
         
         # Try to execute full confirmation workflow
         if self.state.connection_status == ConnectionStatus.CONNECTED:
-            # Calculate new confirmed total
-            new_total = self.state.total_unconfirmed_count
-            
             # Upload current live count first
-            if self.db_manager.upload_count_data(self.config['head_name'], self.state.live_count):
+            if self.db_manager.upload_count_data(self.config['head_name'], confirming):
                 # Execute confirmation workflow
                 if self.db_manager.confirm_counts(self.config['head_name'], new_total):
                     print(f"Successfully confirmed {new_total} total counts")
                     # Reset local state
                     self.state.last_confirmed_count = new_total
                     self.state.unconfirmed_count = 0
-                    self.state.live_count = 0
+                    with self._count_lock:
+                        # A Button 2 reset during the confirm already cleared them
+                        self.state.live_count = max(0, self.state.live_count - confirming)
                     self.state.pending_upload_count = 0
                     # Clear any pending offline records
-                    pending_records = self.offline_manager.get_pending_records()
-                    if pending_records:
-                        record_ids = [getattr(r, 'db_id', None) for r in pending_records if hasattr(r, 'db_id')]
+                    record_ids, _ = self.offline_manager.get_pending_batch()
+                    if record_ids:
                         self.offline_manager.mark_uploaded(record_ids)
                 else:
                     print("Failed to confirm counts in database")
@@ -548,10 +661,15 @@ class SensorSystem:
                 print("Failed to upload live count")
         else:
             # Store for later confirmation when connection restored
-            self.offline_manager.add_count_record(self.state.live_count)
+            self.offline_manager.add_count_record(confirming)
             self.state.pending_upload_count = self.offline_manager.get_total_pending_count()
-            self.state.live_count = 0
+            with self._count_lock:
+                # A Button 2 reset during the confirm already cleared them
+                self.state.live_count = max(0, self.state.live_count - confirming)
+            # The rest of this sync pass uploads it if the database is back
             print(f"Stored count offline. Pending: {self.state.pending_upload_count}")
+        
+        self._dirty.set()
     
     def next_screen(self):
         """Navigate to next display screen (Joystick Right)"""
@@ -559,6 +677,7 @@ class SensorSystem:
         current_index = screens.index(self.state.current_screen)
         next_index = (current_index + 1) % len(screens)
         self.state.current_screen = screens[next_index]
+        self._dirty.set()
         print(f"Switched to screen: {self.state.current_screen.value}")
     
     def previous_screen(self):
@@ -567,12 +686,17 @@ class SensorSystem:
         current_index = screens.index(self.state.current_screen)
         prev_index = (current_index - 1) % len(screens)
         self.state.current_screen = screens[prev_index]
+        self._dirty.set()
         print(f"Switched to screen: {self.state.current_screen.value}")
     
     def _background_sync_loop(self):
         """Background thread for database synchronization"""
         while self.running:
             try:
+                if self._confirm_requested:
+                    self._confirm_requested = False
+                    self._run_confirm()
+                
                 # Check connection status
                 if self.db_manager.is_connected():
                     if self.state.connection_status != ConnectionStatus.CONNECTED:
@@ -585,18 +709,14 @@ class SensorSystem:
                     self.state.unconfirmed_count = counts['unconfirmed']
                     
                     # Try to upload pending offline data
-                    pending_records = self.offline_manager.get_pending_records()
-                    if pending_records:
-                        uploaded_ids = []
-                        for record in pending_records:
-                            if self.db_manager.upload_count_data(self.config['head_name'], record.count):
-                                uploaded_ids.append(getattr(record, 'db_id'))
-                            else:
-                                self.offline_manager.increment_retry_count(getattr(record, 'db_id'))
-                        
-                        if uploaded_ids:
-                            self.offline_manager.mark_uploaded(uploaded_ids)
-                            print(f"Uploaded {len(uploaded_ids)} pending records")
+                    record_ids, counts = self.offline_manager.get_pending_batch()
+                    if record_ids:
+                        if self.db_manager.upload_count_data_bulk(self.config['head_name'], counts):
+                            self.offline_manager.mark_uploaded(record_ids)
+                            print(f"Uploaded {len(record_ids)} pending records")
+                        else:
+                            for record_id in record_ids:
+                                self.offline_manager.increment_retry_count(record_id)
                     
                     # Update pending count
                     self.state.pending_upload_count = self.offline_manager.get_total_pending_count()
@@ -615,14 +735,30 @@ class SensorSystem:
                 print(f"Error in sync loop: {e}")
                 self.state.connection_status = ConnectionStatus.ERROR
                 
-            time.sleep(30)  # Sync every 30 seconds
+            self._dirty.set()
+            
+            # Sync every 30 seconds, or as soon as something is queued
+            self._sync_wake.wait(timeout=30)
+            self._sync_wake.clear()
     
     def _display_update_loop(self):
         """Background thread for display updates"""
+        last_snapshot = None
         while self.running:
             try:
+                # Redraw when state changes, or every 5 seconds as a heartbeat
+                changed = self._dirty.wait(timeout=5)
+                self._dirty.clear()
+                
+                snapshot = (self.state.current_screen, self.state.live_count,
+                            self.state.counting_paused, self.state.connection_status,
+                            self.state.pending_upload_count, self.state.last_confirmed_count,
+                            self.state.unconfirmed_count)
+                if changed and snapshot == last_snapshot:
+                    continue  # Spurious wakeup, nothing visible changed
+                
                 self.display_manager.render_screen(self.state.current_screen, self.state)
-                time.sleep(1)  # Update display every second
+                last_snapshot = snapshot
             except Exception as e:
                 print(f"Error in display loop: {e}")
                 time.sleep(5)
@@ -639,15 +775,15 @@ class SensorSystem:
         if self.db_manager.connect():
             self.state.connection_status = ConnectionStatus.CONNECTED
             print("Connected to database")
+            self._sync_wake.set()  # Drain any offline backlog immediately
         else:
             self.state.connection_status = ConnectionStatus.DISCONNECTED
             print("Starting in offline mode")
         
-        # Main detection loop
+        # Detection happens in the GPIO edge callback; just idle here
         try:
             while self.running:
-                self.detect_metal()
-                time.sleep(0.1)  # Check sensor 10 times per second
+                time.sleep(1)
                 
         except KeyboardInterrupt:
             print("Shutting down...")
@@ -656,12 +792,15 @@ class SensorSystem:
     def stop(self):
         """Stop the sensor system"""
         self.running = False
+        self._dirty.set()  # Wake the display and sync threads so they can exit
+        self._sync_wake.set()
         
         if self.sync_thread.is_alive():
             self.sync_thread.join()
         if self.display_thread.is_alive():
             self.display_thread.join()
             
+        self.offline_manager.close()
         GPIO.cleanup()
         print("Sensor System stopped")
 
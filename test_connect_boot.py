@@ -6,13 +6,16 @@ Waveshare 1.3" OLED HAT Display
 
 import time
 import sys
-from datetime import datetime
+import queue
+import threading
+import statistics
+from collections import deque
 
 try:
     import RPi.GPIO as GPIO
     from luma.core.interface.serial import spi
     from luma.core.render import canvas
-    from luma.oled.device import sh1106
+    from oled_display import PartialSH1106, SPI_SPEED_HZ
     from PIL import ImageFont, ImageDraw, Image
 except ImportError as e:
     print(f"Error importing required libraries: {e}")
@@ -39,6 +42,24 @@ class ConnectBootAnimation:
     def __init__(self, device, font):
         self.device = device
         self.font = font
+        
+        # Static logo behind the pulsing box, drawn once and copied per frame
+        self._pulse_base = Image.new(device.mode, device.size)
+        draw = ImageDraw.Draw(self._pulse_base)
+        draw.text((15, 20), "CONNECT", font=self.font, fill="white")
+        draw.line((15, 35, 113, 35), fill="white", width=2)
+        
+        # Deadline of the current animation frame (time.monotonic)
+        self._next_tick = None
+    
+    def _pace(self, dt):
+        """Sleep until the next frame is due, absorbing the time spent drawing"""
+        now = time.monotonic()
+        if self._next_tick is None or now - self._next_tick > dt:
+            # First frame, or too far behind to catch up: restart the clock
+            self._next_tick = now
+        self._next_tick += dt
+        time.sleep(max(0, self._next_tick - time.monotonic()))
     
     def draw_connect_logo_small(self, draw, y_offset=0):
         """Draw a small version of CONNECT logo that fits on 128x64 display"""
@@ -76,39 +97,56 @@ class ConnectBootAnimation:
         """Slide CONNECT text in from the side"""
         print("  - Sliding logo animation")
         
+        # Rasterize the text once; each frame only stamps it at a new x
+        _, _, right, bottom = ImageDraw.Draw(Image.new("1", (1, 1))).textbbox((0, 0), "CONNECT", font=self.font)
+        text_img = Image.new("1", (right, bottom))
+        ImageDraw.Draw(text_img).text((0, 0), "CONNECT", font=self.font, fill="white")
+        
+        img = Image.new(self.device.mode, self.device.size)
+        draw = ImageDraw.Draw(img)
+        
         for i in range(30):
             progress = i / 29.0
-            with canvas(self.device) as draw:
-                # Start off-screen right, slide to center
-                x_pos = int(128 - (128 - 15) * progress)
-                
-                draw.text((x_pos, 8), "CONNECT", font=self.font, fill="white")
-                
-                # Fade in underline
-                if progress > 0.5:
-                    alpha = (progress - 0.5) * 2
-                    line_width = int(98 * alpha)
-                    draw.line((15, 25, 15 + line_width, 25), fill="white", width=2)
+            draw.rectangle(self.device.bounding_box, fill="black")
+            
+            # Start off-screen right, slide to center
+            x_pos = int(128 - (128 - 15) * progress)
             
-            time.sleep(0.03)
+            draw.bitmap((x_pos, 8), text_img, fill="white")
+            
+            # Fade in underline
+            if progress > 0.5:
+                alpha = (progress - 0.5) * 2
+                line_width = int(98 * alpha)
+                draw.line((15, 25, 15 + line_width, 25), fill="white", width=2)
+            
+            self.device.display(img)
+            self._pace(0.03)
     
     def letter_by_letter_animation(self):
         """Reveal CONNECT one letter at a time"""
         print("  - Letter reveal animation")
         
         text = "CONNECT"
+        
+        # Render every reveal step up front so the loop only pushes frames
+        frames = []
         for i in range(len(text) + 1):
-            with canvas(self.device) as draw:
-                # Show letters revealed so far
-                revealed = text[:i]
-                draw.text((15, 20), revealed, font=self.font, fill="white")
-                
-                # Blinking cursor
-                if i < len(text):
-                    cursor_x = 15 + (i * 12)  # Approximate character width
-                    draw.rectangle((cursor_x, 32, cursor_x + 8, 34), fill="white")
+            img = Image.new(self.device.mode, self.device.size)
+            draw = ImageDraw.Draw(img)
+            # Show letters revealed so far
+            revealed = text[:i]
+            draw.text((15, 20), revealed, font=self.font, fill="white")
             
-            time.sleep(0.15)
+            # Blinking cursor
+            if i < len(text):
+                cursor_x = 15 + (i * 12)  # Approximate character width
+                draw.rectangle((cursor_x, 32, cursor_x + 8, 34), fill="white")
+            frames.append(img)
+        
+        for img in frames:
+            self.device.display(img)
+            self._pace(0.15)
         
         # Show final logo with underline
         time.sleep(0.3)
@@ -122,57 +160,47 @@ class ConnectBootAnimation:
         """Expand from center to reveal logo"""
         print("  - Expanding reveal animation")
         
+        # One offscreen frame, cleared and redrawn each step
+        img = Image.new(self.device.mode, self.device.size)
+        draw = ImageDraw.Draw(img)
+        
         for i in range(25):
             progress = i / 24.0
-            with canvas(self.device) as draw:
-                # Expanding box
-                width = int(128 * progress)
-                height = int(64 * progress)
-                x = (128 - width) // 2
-                y = (64 - height) // 2
-                
-                # Draw border
-                draw.rectangle((x, y, x + width, y + height), outline="white")
-                
-                # Reveal logo when box is large enough
-                if progress > 0.6:
-                    draw.text((15, 20), "CONNECT", font=self.font, fill="white")
-                    draw.line((15, 35, 113, 35), fill="white", width=2)
+            draw.rectangle(self.device.bounding_box, fill="black")
             
-            time.sleep(0.04)
+            # Expanding box
+            width = int(128 * progress)
+            height = int(64 * progress)
+            x = (128 - width) // 2
+            y = (64 - height) // 2
+            
+            # Draw border
+            draw.rectangle((x, y, x + width, y + height), outline="white")
+            
+            # Reveal logo when box is large enough
+            if progress > 0.6:
+                draw.bitmap((0, 0), self._pulse_base, fill="white")
+            
+            self.device.display(img)
+            self._pace(0.04)
     
     def pulse_animation(self):
         """Pulsing CONNECT logo"""
         print("  - Pulse animation")
         
+        # Box offsets for one pulse: expand 0..18, then contract 20..2
+        offsets = (*range(0, 20, 2), *range(20, 0, -2))
+        
         for cycle in range(3):
-            # Expand
-            for i in range(10):
-                with canvas(self.device) as draw:
-                    draw.text((15, 20), "CONNECT", font=self.font, fill="white")
-                    draw.line((15, 35, 113, 35), fill="white", width=2)
-                    
-                    # Expanding box
-                    offset = i * 2
-                    draw.rectangle((15 - offset, 20 - offset, 
-                                  113 + offset, 40 + offset), outline="white")
-                time.sleep(0.03)
-            
-            # Contract
-            for i in range(10, 0, -1):
-                with canvas(self.device) as draw:
-                    draw.text((15, 20), "CONNECT", font=self.font, fill="white")
-                    draw.line((15, 35, 113, 35), fill="white", width=2)
-                    
-                    offset = i * 2
-                    draw.rectangle((15 - offset, 20 - offset, 
-                                  113 + offset, 40 + offset), outline="white")
-                time.sleep(0.03)
+            for offset in offsets:
+                img = self._pulse_base.copy()
+                ImageDraw.Draw(img).rectangle((15 - offset, 20 - offset, 
+                                               113 + offset, 40 + offset), outline="white")
+                self.device.display(img)
+                self._pace(0.03)
         
         # Final static logo
-        with canvas(self.device) as draw:
-            draw.text((15, 20), "CONNECT", font=self.font, fill="white")
-            draw.line((15, 35, 113, 35), fill="white", width=2)
+        self.device.display(self._pulse_base)
         
         time.sleep(0.3)
     
@@ -188,37 +216,40 @@ class ConnectBootAnimation:
         time.sleep(0.5)
         
         # Loading bar
+        bar_width = 100
+        bar_height = 8
+        bar_x = 14
+        bar_y = 45
+        
+        # Static part of the scene, drawn once
+        base = Image.new(self.device.mode, self.device.size)
+        draw = ImageDraw.Draw(base)
+        # Logo at top
+        draw.text((15, 5), "CONNECT", font=self.font, fill="white")
+        draw.line((15, 20, 113, 20), fill="white", width=1)
+        # Loading text
+        draw.text((25, 28), "INITIALIZING", font=self.font, fill="white")
+        # Border
+        draw.rectangle((bar_x, bar_y, bar_x + bar_width, bar_y + bar_height),
+                      outline="white")
+        
         for i in range(101):
             progress = i / 100.0
-            with canvas(self.device) as draw:
-                # Logo at top
-                draw.text((15, 5), "CONNECT", font=self.font, fill="white")
-                draw.line((15, 20, 113, 20), fill="white", width=1)
-                
-                # Loading text
-                draw.text((25, 28), "INITIALIZING", font=self.font, fill="white")
-                
-                # Loading bar
-                bar_width = 100
-                bar_height = 8
-                bar_x = 14
-                bar_y = 45
-                
-                # Border
-                draw.rectangle((bar_x, bar_y, bar_x + bar_width, bar_y + bar_height),
-                              outline="white")
-                
-                # Fill
-                fill_width = int((bar_width - 2) * progress)
-                if fill_width > 0:
-                    draw.rectangle((bar_x + 1, bar_y + 1,
-                                  bar_x + 1 + fill_width, bar_y + bar_height - 1),
-                                  fill="white")
-                
-                # Percentage
-                draw.text((52, 56), f"{i}%", font=self.font, fill="white")
+            img = base.copy()
+            draw = ImageDraw.Draw(img)
+            
+            # Fill
+            fill_width = int((bar_width - 2) * progress)
+            if fill_width > 0:
+                draw.rectangle((bar_x + 1, bar_y + 1,
+                              bar_x + 1 + fill_width, bar_y + bar_height - 1),
+                              fill="white")
+            
+            # Percentage
+            draw.text((52, 56), f"{i}%", font=self.font, fill="white")
+            self.device.display(img)
             
-            time.sleep(0.02)
+            self._pace(0.02)
         
         time.sleep(0.3)
     
@@ -253,15 +284,17 @@ class ConnectBootAnimation:
         print("✓ Boot animation complete!")
 
 class DisplayTest:
+    IP_CACHE_TTL = 5  # Seconds before the cached IP address is re-resolved
+    
     def __init__(self):
         # Initialize GPIO FIRST
-        print("Setting up GPIO (polling mode)...")
+        print("Setting up GPIO (edge detection, polling fallback)...")
         self.setup_buttons()
         
         print("Initializing display (SH1106, 4-wire SPI)...")
         try:
-            serial = spi(device=0, port=0, bus_speed_hz=8000000, dc_pin=DC_PIN, rst_pin=RST_PIN)
-            self.device = sh1106(serial, rotate=2)
+            serial = spi(device=0, port=0, bus_speed_hz=SPI_SPEED_HZ, dc_pin=DC_PIN, rst_pin=RST_PIN)
+            self.device = PartialSH1106(serial, rotate=2)
             print(f"✓ Display initialized: {self.device.width}x{self.device.height}")
         except Exception as e:
             print(f"✗ Display init failed: {e}")
@@ -280,6 +313,22 @@ class DisplayTest:
         self.last_button = "None"
         self.current_screen = 0
         self.test_counter = 0
+        self._screens = [self.draw_screen_0, self.draw_screen_1,
+                         self.draw_screen_2, self.draw_screen_3]
+        
+        # Screens are drawn on a separate thread so SPI writes never delay input
+        self._render_tick = threading.Event()
+        self._stop = False
+        
+        self._ip_cache = (None, 0.0)  # (ip_address, time.monotonic() when resolved)
+        self._time_str = ""
+        self._time_str_ts = None  # Whole second _time_str was formatted for
+        
+        # Fixed screen labels, rasterized once and stamped with draw.bitmap
+        self._label_cache = {}
+        for text in ["CONNECT", "Sensor System", "Use <- -> navigate",
+                     "=== SYSTEM INFO ===", "=== BUTTON TEST ===", "== JOYSTICK TEST =="]:
+            self._label_cache[text] = self._render_label(text)
         
         # Button state tracking for polling
         self.button_states = {}
@@ -300,6 +349,10 @@ class DisplayTest:
                 self.button_states[pin] = GPIO.input(pin)
             except:
                 self.button_states[pin] = 1
+        
+        # Ignore presses made while the boot animation was running
+        while not self._edge_q.empty():
+            self._edge_q.get_nowait()
     
     def setup_buttons(self):
         GPIO.setmode(GPIO.BCM)
@@ -308,27 +361,44 @@ class DisplayTest:
         pins = [KEY1_PIN, KEY2_PIN, KEY3_PIN, JOYSTICK_UP, JOYSTICK_DOWN, 
                 JOYSTICK_LEFT, JOYSTICK_RIGHT, JOYSTICK_PRESS]
         
+        # Pins of pressed buttons, queued from the GPIO edge callback thread
+        self._edge_q = queue.Queue()
+        # Pins where edge detection is unavailable and we still poll
+        self._polled_pins = []
+        
         for pin in pins:
             try:
                 GPIO.setup(pin, GPIO.IN, pull_up_down=GPIO.PUD_UP)
                 print(f"✓ GPIO {pin} configured")
             except Exception as e:
                 print(f"✗ GPIO {pin} setup failed: {e}")
+                continue
+            
+            try:
+                GPIO.add_event_detect(pin, GPIO.FALLING, callback=self._edge_q.put, bouncetime=20)
+            except Exception as e:
+                print(f"✗ GPIO {pin} edge detection failed, polling instead: {e}")
+                self._polled_pins.append(pin)
         
-        print("✓ All buttons configured for POLLING")
+        print("✓ All buttons configured (edge detection)")
     
     def poll_buttons(self):
-        for pin, name in self.pin_map.items():
+        # Presses caught by edge detection
+        while True:
             try:
-                current_state = GPIO.input(pin)
-                previous_state = self.button_states.get(pin, 1)
-                
-                if previous_state == 1 and current_state == 0:
-                    self.handle_button_press(name)
-                
-                self.button_states[pin] = current_state
-            except:
-                pass
+                pin = self._edge_q.get_nowait()
+            except queue.Empty:
+                break
+            self.handle_button_press(self.pin_map[pin])
+        
+        # Only pins that passed GPIO.setup in setup_buttons are polled
+        for pin in self._polled_pins:
+            current_state = GPIO.input(pin)
+            
+            if self.button_states[pin] == 1 and current_state == 0:
+                self.handle_button_press(self.pin_map[pin])
+            
+            self.button_states[pin] = current_state
     
     def handle_button_press(self, btn):
         self.button_presses[btn] += 1
@@ -346,37 +416,63 @@ class DisplayTest:
             self.test_counter = 0
         
         print(f"Button: {btn} (Total: {self.button_presses[btn]})")
+        self._render_tick.set()
     
     def clear_display(self):
         with canvas(self.device) as draw:
             draw.rectangle(self.device.bounding_box, outline="black", fill="black")
     
+    def _render_label(self, text):
+        """Rasterize text into a 1-bit mask that draw.bitmap places like draw.text"""
+        _, _, right, bottom = ImageDraw.Draw(Image.new("1", (1, 1))).textbbox((0, 0), text, font=self.font)
+        img = Image.new("1", (right, bottom))
+        ImageDraw.Draw(img).text((0, 0), text, font=self.font, fill="white")
+        return img
+    
     def draw_screen_0(self):
         with canvas(self.device) as draw:
-            draw.text((20, 5), "CONNECT", font=self.font, fill="white")
+            draw.bitmap((20, 5), self._label_cache["CONNECT"], fill="white")
             draw.line((20, 20, 108, 20), fill="white", width=1)
-            draw.text((10, 28), "Sensor System", font=self.font, fill="white")
-            draw.text((0, 45), "Use <- -> navigate", font=self.font, fill="white")
+            draw.bitmap((10, 28), self._label_cache["Sensor System"], fill="white")
+            draw.bitmap((0, 45), self._label_cache["Use <- -> navigate"], fill="white")
+    
+    def get_ip(self):
+        """Get the device's IP address, cached for IP_CACHE_TTL seconds"""
+        ip, resolved_at = self._ip_cache
+        if ip is not None and time.monotonic() - resolved_at < self.IP_CACHE_TTL:
+            return ip
+        
+        import socket
+        try:
+            s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            s.connect(("8.8.8.8", 80))
+            ip = s.getsockname()[0]
+            s.close()
+        except:
+            ip = "N/A"
+        self._ip_cache = (ip, time.monotonic())
+        return ip
+    
+    def get_time_str(self):
+        """Current time as HH:MM:SS, formatted at most once per second"""
+        now = int(time.time())
+        if now != self._time_str_ts:
+            self._time_str = time.strftime('%H:%M:%S', time.localtime(now))
+            self._time_str_ts = now
+        return self._time_str
     
     def draw_screen_1(self):
         with canvas(self.device) as draw:
-            draw.text((0, 0), "=== SYSTEM INFO ===", font=self.font, fill="white")
-            import socket
-            try:
-                s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-                s.connect(("8.8.8.8", 80))
-                ip = s.getsockname()[0]
-                s.close()
-            except:
-                ip = "N/A"
+            draw.bitmap((0, 0), self._label_cache["=== SYSTEM INFO ==="], fill="white")
+            ip = self.get_ip()
             draw.text((0, 15), f"IP: {ip}", font=self.font, fill="white")
-            draw.text((0, 28), f"Time: {datetime.now().strftime('%H:%M:%S')}", font=self.font, fill="white")
+            draw.text((0, 28), f"Time: {self.get_time_str()}", font=self.font, fill="white")
             draw.text((0, 41), f"Counter: {self.test_counter}", font=self.font, fill="white")
             draw.text((0, 54), f"Screen: {self.current_screen + 1}/4", font=self.font, fill="white")
     
     def draw_screen_2(self):
         with canvas(self.device) as draw:
-            draw.text((0, 0), "=== BUTTON TEST ===", font=self.font, fill="white")
+            draw.bitmap((0, 0), self._label_cache["=== BUTTON TEST ==="], fill="white")
             draw.text((0, 12), f"Last: {self.last_button}", font=self.font, fill="white")
             y = 25
             for btn in ['KEY1', 'KEY2', 'KEY3']:
@@ -386,7 +482,7 @@ class DisplayTest:
     
     def draw_screen_3(self):
         with canvas(self.device) as draw:
-            draw.text((0, 0), "== JOYSTICK TEST ==", font=self.font, fill="white")
+            draw.bitmap((0, 0), self._label_cache["== JOYSTICK TEST =="], fill="white")
             y = 12
             for btn in ['UP', 'DOWN', 'LEFT', 'RIGHT', 'PRESS']:
                 count = self.button_presses[btn]
@@ -405,36 +501,66 @@ class DisplayTest:
         print("  Ctrl+C      - Exit test")
         print("\n" + "="*60 + "\n")
         
+        render_thread = threading.Thread(target=self._render_loop, daemon=True)
+        # Draw the first screen right away instead of waiting for a press
+        self._render_tick.set()
+        render_thread.start()
+        
         try:
-            frame_count = 0
-            last_poll = time.time()
-            last_display_update = time.time()
-            
             while True:
-                current_time = time.time()
+                self.poll_buttons()
                 
-                if current_time - last_poll >= 0.02:
-                    self.poll_buttons()
-                    last_poll = current_time
-                
-                if current_time - last_display_update >= 0.1:
-                    if self.current_screen == 0:
-                        self.draw_screen_0()
-                    elif self.current_screen == 1:
-                        self.draw_screen_1()
-                    elif self.current_screen == 2:
-                        self.draw_screen_2()
-                    elif self.current_screen == 3:
-                        self.draw_screen_3()
-                    
-                    last_display_update = current_time
-                
-                time.sleep(0.005)
+                # Block until a button edge arrives (polled pins need a 20ms tick)
+                try:
+                    pin = self._edge_q.get(timeout=0.02 if self._polled_pins else None)
+                    self.handle_button_press(self.pin_map[pin])
+                except queue.Empty:
+                    pass
                 
         except KeyboardInterrupt:
             print("\nTest stopped by user")
+            self._stop = True
+            self._render_tick.set()
+            render_thread.join()
             self.cleanup()
     
+    def _scene_key(self):
+        """Everything the current screen shows, to tell when it needs a redraw"""
+        key = (self.current_screen, self.test_counter, self.last_button,
+               tuple(self.button_presses.values()))
+        if self.current_screen == 1:
+            # The info screen also shows the clock (to the second) and IP
+            key += (int(time.time()), self.get_ip())
+        return key
+    
+    def _render_loop(self):
+        """Redraw the current screen as soon as a button is pressed or its clock ticks"""
+        last_scene = None
+        frame_times = deque(maxlen=50)  # Seconds each recent redraw took
+        last_draw = 0
+        while not self._stop:
+            # Only the info screen changes on its own, at each whole second
+            timeout = 1 - time.time() % 1 if self.current_screen == 1 else None
+            self._render_tick.wait(timeout=timeout)
+            self._render_tick.clear()
+            
+            # Space redraws by twice the typical draw time so a burst of
+            # presses collapses into one frame instead of queueing SPI writes
+            if frame_times:
+                time.sleep(max(0, last_draw + 2 * statistics.median(frame_times) - time.monotonic()))
+            if self._stop:
+                break
+            
+            # Nothing on screen would change, skip the draw and SPI write
+            scene = self._scene_key()
+            if scene == last_scene:
+                continue
+            last_scene = scene
+            
+            last_draw = time.monotonic()
+            self._screens[self.current_screen]()
+            frame_times.append(time.monotonic() - last_draw)
+    
     def cleanup(self):
         print("Cleaning up...")
         with canvas(self.device) as draw:
@@ -6,14 +6,15 @@ For Raspberry Pi 3 Model B v1.2
 
 import time
 import sys
-from datetime import datetime
+import queue
+import threading
 
 try:
     import RPi.GPIO as GPIO
     from luma.core.interface.serial import spi
     from luma.core.render import canvas
-    from luma.oled.device import sh1106
-    from PIL import ImageFont, ImageDraw
+    from oled_display import PartialSH1106, SPI_SPEED_HZ
+    from PIL import ImageFont, ImageDraw, Image
 except ImportError as e:
     print(f"Error importing required libraries: {e}")
     print("\nPlease install required packages:")
@@ -33,91 +34,118 @@ JOYSTICK_PRESS = 13
 DC_PIN = 24
 RST_PIN = 25
 
+# Most rendered text lines kept for the dynamic screens
+TEXT_CACHE_SIZE = 256
+
+class BufferSPI(spi):
+    """luma SPI interface that passes byte buffers to spidev without a list copy"""
+    
+    def _write_bytes(self, data):
+        # writebytes2 takes bytes (and lists) directly and splits large writes itself
+        self._spi.writebytes2(data)
+
 class BootAnimation:
     """Cool boot animation for the display"""
     
     def __init__(self, device, font):
         self.device = device
         self.font = font
+        # One frame buffer reused by every animation frame
+        self._img = Image.new(device.mode, device.size)
+        self._draw = ImageDraw.Draw(self._img)
+    
+    def _frame(self):
+        """Clear the reused frame buffer and return its ImageDraw"""
+        self._draw.rectangle(self.device.bounding_box, fill=0)
+        return self._draw
     
     def draw_logo_frame(self, progress):
         """Draw a single frame of the logo animation"""
-        with canvas(self.device) as draw:
-            # Draw a cool expanding circle logo
-            center_x = 64
-            center_y = 32
-            max_radius = 30
-            
-            # Expanding circles
-            radius = int(max_radius * progress)
-            if radius > 0:
-                draw.ellipse((center_x - radius, center_y - radius,
-                             center_x + radius, center_y + radius),
-                            outline="white", fill=None)
-            
-            # Inner circle appears halfway through
-            if progress > 0.5:
-                inner_radius = int(radius * 0.6)
-                draw.ellipse((center_x - inner_radius, center_y - inner_radius,
-                             center_x + inner_radius, center_y + inner_radius),
-                            outline="white", fill="white")
-            
-            # Draw "Pi Sensor" text that fades in
-            if progress > 0.7:
-                text_alpha = (progress - 0.7) / 0.3  # 0 to 1
-                if text_alpha > 0.5:
-                    draw.text((20, 5), "Pi Sensor", font=self.font, fill="white")
-                    draw.text((30, 50), "v2.0", font=self.font, fill="white")
+        draw = self._frame()
+        # Draw a cool expanding circle logo
+        center_x = 64
+        center_y = 32
+        max_radius = 30
+        
+        # Expanding circles
+        radius = int(max_radius * progress)
+        if radius > 0:
+            draw.ellipse((center_x - radius, center_y - radius,
+                         center_x + radius, center_y + radius),
+                        outline=1, fill=None)
+        
+        # Inner circle appears halfway through
+        if progress > 0.5:
+            inner_radius = int(radius * 0.6)
+            draw.ellipse((center_x - inner_radius, center_y - inner_radius,
+                         center_x + inner_radius, center_y + inner_radius),
+                        outline=1, fill=1)
+        
+        # Draw "Pi Sensor" text that fades in
+        if progress > 0.7:
+            text_alpha = (progress - 0.7) / 0.3  # 0 to 1
+            if text_alpha > 0.5:
+                draw.text((20, 5), "Pi Sensor", font=self.font, fill=1)
+                draw.text((30, 50), "v2.0", font=self.font, fill=1)
+        self.device.display(self._img)
     
     def expanding_box_animation(self):
         """Expanding box with text reveal"""
+        blank = Image.new(self.device.mode, self.device.size)
+        titled = blank.copy()
+        ImageDraw.Draw(titled).text((15, 25), "WAVESHARE", font=self.font, fill=1)
+        
         for i in range(20):
             progress = i / 19.0
-            with canvas(self.device) as draw:
-                # Expanding box from center
-                width = int(128 * progress)
-                height = int(64 * progress)
-                x = (128 - width) // 2
-                y = (64 - height) // 2
-                
-                draw.rectangle((x, y, x + width, y + height), outline="white")
-                
-                # Text appears when box is 80% expanded
-                if progress > 0.8:
-                    draw.text((15, 25), "WAVESHARE", font=self.font, fill="white")
+            # Text appears when box is 80% expanded
+            self._img.paste(titled if progress > 0.8 else blank)
+            draw = self._draw
+            
+            # Expanding box from center
+            width = int(128 * progress)
+            height = int(64 * progress)
+            x = (128 - width) // 2
+            y = (64 - height) // 2
+            
+            draw.rectangle((x, y, x + width, y + height), outline=1)
+            self.device.display(self._img)
             time.sleep(0.03)
     
     def loading_bar_animation(self):
         """Classic loading bar"""
         with canvas(self.device) as draw:
-            draw.text((25, 10), "INITIALIZING", font=self.font, fill="white")
+            draw.text((25, 10), "INITIALIZING", font=self.font, fill=1)
         
         time.sleep(0.3)
         
+        # Loading bar
+        bar_width = 100
+        bar_height = 10
+        bar_x = (128 - bar_width) // 2
+        bar_y = 35
+        
+        # Title and outer border are the same in every frame, draw them once
+        background = Image.new(self.device.mode, self.device.size)
+        draw = ImageDraw.Draw(background)
+        draw.text((25, 10), "INITIALIZING", font=self.font, fill=1)
+        draw.rectangle((bar_x, bar_y, bar_x + bar_width, bar_y + bar_height),
+                      outline=1)
+        
         for i in range(101):
             progress = i / 100.0
-            with canvas(self.device) as draw:
-                draw.text((25, 10), "INITIALIZING", font=self.font, fill="white")
-                
-                # Loading bar
-                bar_width = 100
-                bar_height = 10
-                bar_x = (128 - bar_width) // 2
-                bar_y = 35
-                
-                # Outer border
-                draw.rectangle((bar_x, bar_y, bar_x + bar_width, bar_y + bar_height),
-                              outline="white")
-                
-                # Filled portion
-                fill_width = int(bar_width * progress) - 2
-                if fill_width > 0:
-                    draw.rectangle((bar_x + 1, bar_y + 1,
-                                  bar_x + 1 + fill_width, bar_y + bar_height - 1),
-                                  fill="white")
-                
-                # Percentage
-                draw.text((50, 50), f"{i}%", font=self.font, fill="white")
+            self._img.paste(background)
+            draw = self._draw
+            
+            # Filled portion
+            fill_width = int(bar_width * progress) - 2
+            if fill_width > 0:
+                draw.rectangle((bar_x + 1, bar_y + 1,
+                              bar_x + 1 + fill_width, bar_y + bar_height - 1),
+                              fill=1)
+            
+            # Percentage
+            draw.text((50, 50), f"{i}%", font=self.font, fill=1)
+            self.device.display(self._img)
             
             time.sleep(0.02)
     
@@ -135,28 +163,30 @@ class BootAnimation:
             })
         
         for frame in range(40):
-            with canvas(self.device) as draw:
-                # Update and draw each column
-                for col in columns:
-                    # Draw trail
-                    for i in range(8):
-                        y = col['y'] - (i * 4)
-                        if 0 <= y < 64:
-                            brightness = 8 - i
-                            if brightness > 4:
-                                draw.point((col['x'], y), fill="white")
-                    
-                    # Move column down
-                    col['y'] += col['speed']
-                    
-                    # Reset if off screen
-                    if col['y'] > 64:
-                        col['y'] = random.randint(-32, 0)
-                        col['speed'] = random.randint(2, 6)
+            draw = self._frame()
+            # Collect every lit trail pixel, then plot them in one call
+            points = []
+            for col in columns:
+                # Only the 4 brightest of the 8 trail dots are lit
+                for i in range(4):
+                    y = col['y'] - (i * 4)
+                    if 0 <= y < 64:
+                        points.append((col['x'], y))
                 
-                # Draw "READY" text in center after halfway
-                if frame > 20:
-                    draw.text((40, 25), "READY", font=self.font, fill="white")
+                # Move column down
+                col['y'] += col['speed']
+                
+                # Reset if off screen
+                if col['y'] > 64:
+                    col['y'] = random.randint(-32, 0)
+                    col['speed'] = random.randint(2, 6)
+            
+            draw.point(points, fill=1)
+            
+            # Draw "READY" text in center after halfway
+            if frame > 20:
+                draw.text((40, 25), "READY", font=self.font, fill=1)
+            self.device.display(self._img)
             
             time.sleep(0.05)
     
@@ -185,23 +215,25 @@ class BootAnimation:
         
         # 4. Final "READY" message
         with canvas(self.device) as draw:
-            draw.text((35, 20), "SYSTEM", font=self.font, fill="white")
-            draw.text((40, 35), "READY", font=self.font, fill="white")
+            draw.text((35, 20), "SYSTEM", font=self.font, fill=1)
+            draw.text((40, 35), "READY", font=self.font, fill=1)
         
         time.sleep(1)
         
         print("✓ Boot animation complete!")
 
 class DisplayTest:
+    IP_CACHE_TTL = 30  # Seconds before the cached IP address is re-resolved
+    
     def __init__(self):
         # Initialize GPIO FIRST
-        print("Setting up GPIO (polling mode - no interrupts)...")
+        print("Setting up GPIO (edge detection)...")
         self.setup_buttons()
         
         print("Initializing display (SH1106, 4-wire SPI)...")
         try:
-            serial = spi(device=0, port=0, bus_speed_hz=8000000, dc_pin=DC_PIN, rst_pin=RST_PIN)
-            self.device = sh1106(serial, rotate=2)
+            serial = BufferSPI(device=0, port=0, bus_speed_hz=SPI_SPEED_HZ, dc_pin=DC_PIN, rst_pin=RST_PIN)
+            self.device = PartialSH1106(serial, rotate=2)
             print(f"✓ Display initialized: {self.device.width}x{self.device.height}")
         except Exception as e:
             print(f"✗ Display init failed: {e}")
@@ -216,12 +248,39 @@ class DisplayTest:
         boot_anim = BootAnimation(self.device, self.font)
         boot_anim.run_full_boot_sequence()
         
+        # Text that never changes on each screen, drawn once
+        self._static = [Image.new(self.device.mode, self.device.size) for _ in range(4)]
+        draw = ImageDraw.Draw(self._static[0])
+        draw.text((10, 0), "WAVESHARE HAT", font=self.font, fill=1)
+        draw.text((15, 15), "EDGE EVENTS", font=self.font, fill=1)
+        draw.text((5, 30), "128x64 OLED", font=self.font, fill=1)
+        draw.text((0, 45), "Use <- -> navigate", font=self.font, fill=1)
+        ImageDraw.Draw(self._static[1]).text((0, 0), "=== SYSTEM INFO ===", font=self.font, fill=1)
+        ImageDraw.Draw(self._static[2]).text((0, 0), "=== BUTTON TEST ===", font=self.font, fill=1)
+        ImageDraw.Draw(self._static[3]).text((0, 0), "== JOYSTICK TEST ==", font=self.font, fill=1)
+        self._text_cache = {}
+        # Screens are composed into the back buffer on the main thread and
+        # sent from the front buffer by the display thread, so SPI writes
+        # never delay input handling
+        self._back = Image.new(self.device.mode, self.device.size)
+        self._back_draw = ImageDraw.Draw(self._back)
+        self._front = Image.new(self.device.mode, self.device.size)
+        self._front_draw = ImageDraw.Draw(self._front)
+        self._frame_ready = threading.Condition()
+        self._frame_pending = False  # _front holds a frame not yet sent
+        self._sending = False  # Display thread is writing _front to the OLED
+        self._stop = threading.Event()
+        
+        self._ip_cache = (None, 0.0)  # (ip_address, time.monotonic() when resolved)
+        self._time_str = ""
+        self._time_str_ts = None  # Whole second _time_str was formatted for
+        
         self.button_presses = {k: 0 for k in ['KEY1','KEY2','KEY3','UP','DOWN','LEFT','RIGHT','PRESS']}
         self.last_button = "None"
         self.current_screen = 0
         self.test_counter = 0
         
-        # Button state tracking for polling
+        # Button state tracking for pins that fell back to polling
         self.button_states = {}
         self.pin_map = {
             KEY1_PIN: 'KEY1',
@@ -240,6 +299,13 @@ class DisplayTest:
                 self.button_states[pin] = GPIO.input(pin)
             except:
                 self.button_states[pin] = 1
+        
+        # (pin, name) pairs for the polled pins, unpacked once for poll_buttons
+        self._poll_list = [(pin, self.pin_map[pin]) for pin in self._polled_pins]
+        
+        # Ignore presses made while the boot animation was running
+        while not self._edge_q.empty():
+            self._edge_q.get_nowait()
     
     def setup_buttons(self):
         GPIO.setmode(GPIO.BCM)
@@ -248,27 +314,38 @@ class DisplayTest:
         pins = [KEY1_PIN, KEY2_PIN, KEY3_PIN, JOYSTICK_UP, JOYSTICK_DOWN, 
                 JOYSTICK_LEFT, JOYSTICK_RIGHT, JOYSTICK_PRESS]
         
+        # Pins of pressed buttons, queued from the GPIO edge callback thread
+        self._edge_q = queue.Queue()
+        # Pins where edge detection is unavailable and we still poll
+        self._polled_pins = []
+        
         for pin in pins:
             try:
                 GPIO.setup(pin, GPIO.IN, pull_up_down=GPIO.PUD_UP)
                 print(f"✓ GPIO {pin} configured")
             except Exception as e:
                 print(f"✗ GPIO {pin} setup failed: {e}")
+                continue
+            
+            try:
+                GPIO.add_event_detect(pin, GPIO.FALLING, callback=self._edge_q.put, bouncetime=20)
+            except Exception as e:
+                print(f"✗ GPIO {pin} edge detection failed, polling instead: {e}")
+                self._polled_pins.append(pin)
         
-        print("✓ All buttons configured for POLLING")
+        print("✓ All buttons configured (edge detection)")
     
     def poll_buttons(self):
-        for pin, name in self.pin_map.items():
-            try:
-                current_state = GPIO.input(pin)
-                previous_state = self.button_states.get(pin, 1)
-                
-                if previous_state == 1 and current_state == 0:
-                    self.handle_button_press(name)
-                
-                self.button_states[pin] = current_state
-            except:
-                pass
+        read = GPIO.input
+        states = self.button_states
+        # Only pins that passed GPIO.setup are in _poll_list, so reads can't fail
+        for pin, name in self._poll_list:
+            current_state = read(pin)
+            
+            if states[pin] == 1 and current_state == 0:
+                self.handle_button_press(name)
+            
+            states[pin] = current_state
     
     def handle_button_press(self, btn):
         self.button_presses[btn] += 1
@@ -289,53 +366,111 @@ class DisplayTest:
     
     def clear_display(self):
         with canvas(self.device) as draw:
-            draw.rectangle(self.device.bounding_box, outline="black", fill="black")
+            draw.rectangle(self.device.bounding_box, outline=0, fill=0)
+    
+    def _text(self, draw, xy, text):
+        """Stamp a cached 1-bit rendering of a whole text line"""
+        mask = self._text_cache.get(text)
+        if mask is None:
+            if len(self._text_cache) >= TEXT_CACHE_SIZE:
+                self._text_cache.clear()
+            _, _, right, bottom = draw.textbbox((0, 0), text, font=self.font)
+            mask = Image.new("1", (right, bottom))
+            ImageDraw.Draw(mask).text((0, 0), text, font=self.font, fill=1)
+            self._text_cache[text] = mask
+        draw.bitmap(xy, mask, fill=1)
+    
+    def _present(self):
+        """Swap the finished back buffer to the front for the display thread"""
+        with self._frame_ready:
+            # The old front becomes the next back buffer, wait until it's sent
+            while self._sending:
+                self._frame_ready.wait()
+            self._front, self._back = self._back, self._front
+            self._front_draw, self._back_draw = self._back_draw, self._front_draw
+            self._frame_pending = True
+            self._frame_ready.notify_all()
+    
+    def _display_loop(self):
+        """Send each presented frame to the OLED, off the input thread"""
+        while True:
+            with self._frame_ready:
+                while not self._frame_pending and not self._stop.is_set():
+                    self._frame_ready.wait()
+                if self._stop.is_set():
+                    return
+                self._frame_pending = False
+                self._sending = True
+                frame = self._front
+            
+            self.device.display(frame)
+            
+            with self._frame_ready:
+                self._sending = False
+                self._frame_ready.notify_all()
     
     def draw_screen_0(self):
-        with canvas(self.device) as draw:
-            draw.text((10, 0), "WAVESHARE HAT", font=self.font, fill="white")
-            draw.text((15, 15), "POLLING MODE", font=self.font, fill="white")
-            draw.text((5, 30), "128x64 OLED", font=self.font, fill="white")
-            draw.text((0, 45), "Use <- -> navigate", font=self.font, fill="white")
+        self._back.paste(self._static[0])
+        self._present()
+    
+    def get_ip(self):
+        """Get the device's IP address, cached for IP_CACHE_TTL seconds"""
+        ip, resolved_at = self._ip_cache
+        if ip is not None and time.monotonic() - resolved_at < self.IP_CACHE_TTL:
+            return ip
+        
+        import socket
+        try:
+            s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            s.connect(("8.8.8.8", 80))
+            ip = s.getsockname()[0]
+            s.close()
+        except:
+            ip = "N/A"
+        self._ip_cache = (ip, time.monotonic())
+        return ip
+    
+    def get_time_str(self):
+        """Current time as HH:MM:SS, formatted at most once per second"""
+        now = int(time.time())
+        if now != self._time_str_ts:
+            self._time_str = time.strftime('%H:%M:%S', time.localtime(now))
+            self._time_str_ts = now
+        return self._time_str
     
     def draw_screen_1(self):
-        with canvas(self.device) as draw:
-            draw.text((0, 0), "=== SYSTEM INFO ===", font=self.font, fill="white")
-            import socket
-            try:
-                s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-                s.connect(("8.8.8.8", 80))
-                ip = s.getsockname()[0]
-                s.close()
-            except:
-                ip = "N/A"
-            draw.text((0, 15), f"IP: {ip}", font=self.font, fill="white")
-            draw.text((0, 28), f"Time: {datetime.now().strftime('%H:%M:%S')}", font=self.font, fill="white")
-            draw.text((0, 41), f"Counter: {self.test_counter}", font=self.font, fill="white")
-            draw.text((0, 54), f"Screen: {self.current_screen + 1}/4", font=self.font, fill="white")
+        self._back.paste(self._static[1])
+        draw = self._back_draw
+        self._text(draw, (0, 15), f"IP: {self.get_ip()}")
+        self._text(draw, (0, 28), f"Time: {self.get_time_str()}")
+        self._text(draw, (0, 41), f"Counter: {self.test_counter}")
+        self._text(draw, (0, 54), f"Screen: {self.current_screen + 1}/4")
+        self._present()
     
     def draw_screen_2(self):
-        with canvas(self.device) as draw:
-            draw.text((0, 0), "=== BUTTON TEST ===", font=self.font, fill="white")
-            draw.text((0, 12), f"Last: {self.last_button}", font=self.font, fill="white")
-            y = 25
-            for btn in ['KEY1', 'KEY2', 'KEY3']:
-                count = self.button_presses[btn]
-                draw.text((0, y), f"{btn}: {count}", font=self.font, fill="white")
-                y += 12
+        self._back.paste(self._static[2])
+        draw = self._back_draw
+        self._text(draw, (0, 12), f"Last: {self.last_button}")
+        y = 25
+        for btn in ['KEY1', 'KEY2', 'KEY3']:
+            count = self.button_presses[btn]
+            self._text(draw, (0, y), f"{btn}: {count}")
+            y += 12
+        self._present()
     
     def draw_screen_3(self):
-        with canvas(self.device) as draw:
-            draw.text((0, 0), "== JOYSTICK TEST ==", font=self.font, fill="white")
-            y = 12
-            for btn in ['UP', 'DOWN', 'LEFT', 'RIGHT', 'PRESS']:
-                count = self.button_presses[btn]
-                draw.text((0, y), f"{btn}: {count}", font=self.font, fill="white")
-                y += 10
+        self._back.paste(self._static[3])
+        draw = self._back_draw
+        y = 12
+        for btn in ['UP', 'DOWN', 'LEFT', 'RIGHT', 'PRESS']:
+            count = self.button_presses[btn]
+            self._text(draw, (0, y), f"{btn}: {count}")
+            y += 10
+        self._present()
     
     def run_test(self):
         print("\n" + "="*60)
-        print("Display Test Running (RPI 3B - POLLING MODE)")
+        print("Display Test Running (RPI 3B - EDGE EVENTS)")
         print("="*60)
         print("\nControls:")
         print("  LEFT/RIGHT  - Navigate screens")
@@ -345,19 +480,22 @@ class DisplayTest:
         print("  Ctrl+C      - Exit test")
         print("\n" + "="*60 + "\n")
         
+        display_thread = threading.Thread(target=self._display_loop, daemon=True)
+        display_thread.start()
+        
         try:
-            frame_count = 0
-            last_poll = time.time()
-            last_display_update = time.time()
+            # Monotonic deadlines, so NTP clock steps can't stall or rush the loop
+            poll_deadline = time.monotonic()
+            display_deadline = time.monotonic()
             
             while True:
-                current_time = time.time()
+                now = time.monotonic()
                 
-                if current_time - last_poll >= 0.02:
+                if self._polled_pins and now >= poll_deadline:
                     self.poll_buttons()
-                    last_poll = current_time
+                    poll_deadline = now + 0.02
                 
-                if current_time - last_display_update >= 0.1:
+                if now >= display_deadline:
                     if self.current_screen == 0:
                         self.draw_screen_0()
                     elif self.current_screen == 1:
@@ -367,19 +505,29 @@ class DisplayTest:
                     elif self.current_screen == 3:
                         self.draw_screen_3()
                     
-                    last_display_update = current_time
+                    display_deadline = now + 0.1
                 
-                time.sleep(0.005)
+                # Block until a button edge arrives or the next deadline is due
+                next_deadline = min(poll_deadline, display_deadline) if self._polled_pins else display_deadline
+                try:
+                    pin = self._edge_q.get(timeout=max(0, next_deadline - time.monotonic()))
+                    self.handle_button_press(self.pin_map[pin])
+                except queue.Empty:
+                    pass
                 
         except KeyboardInterrupt:
             print("\nTest stopped by user")
+            with self._frame_ready:
+                self._stop.set()
+                self._frame_ready.notify_all()
+            display_thread.join()
             self.cleanup()
     
     def cleanup(self):
         print("Cleaning up...")
         with canvas(self.device) as draw:
-            draw.rectangle(self.device.bounding_box, outline="black", fill="black")
-            draw.text((20, 25), "Test Complete", font=self.font, fill="white")
+            draw.rectangle(self.device.bounding_box, outline=0, fill=0)
+            draw.text((20, 25), "Test Complete", font=self.font, fill=1)
         time.sleep(1)
         self.clear_display()
         GPIO.cleanup()
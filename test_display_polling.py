@@ -6,14 +6,18 @@ Uses polling instead of edge detection to avoid permission issues
 
 import time
 import sys
+import os
+import mmap
+import struct
+import queue
+import threading
 from datetime import datetime
 
 try:
     import RPi.GPIO as GPIO
     from luma.core.interface.serial import spi
-    from luma.core.render import canvas
-    from luma.oled.device import sh1106
-    from PIL import ImageFont
+    from oled_display import PartialSH1106, SPI_SPEED_HZ
+    from PIL import ImageFont, ImageDraw, Image
 except ImportError as e:
     print(f"Error importing required libraries: {e}")
     print("\nPlease install required packages:")
@@ -33,7 +37,18 @@ JOYSTICK_PRESS = 13
 DC_PIN = 24
 RST_PIN = 25
 
+# Presses of the same button closer together than this are contact bounce
+DEBOUNCE_S = 0.05
+
+# Most rendered text lines kept for the dynamic screens
+TEXT_CACHE_SIZE = 256
+
+# Byte offset of GPLEV0 (input levels of GPIO 0-31) in /dev/gpiomem
+GPLEV0_OFFSET = 0x34
+
 class DisplayTest:
+    IP_CACHE_TTL = 60  # Seconds before the cached IP address is re-resolved
+    
     def __init__(self):
         # Initialize GPIO FIRST
         print("Setting up GPIO (polling mode - no interrupts)...")
@@ -41,8 +56,10 @@ class DisplayTest:
         
         print("Initializing display (SH1106, 4-wire SPI)...")
         try:
-            serial = spi(device=0, port=0, bus_speed_hz=8000000, dc_pin=DC_PIN, rst_pin=RST_PIN)
-            self.device = sh1106(serial, rotate=2)
+            # transfer_size covers a whole frame, so no write is ever split
+            serial = spi(device=0, port=0, bus_speed_hz=SPI_SPEED_HZ, transfer_size=4096,
+                         dc_pin=DC_PIN, rst_pin=RST_PIN)
+            self.device = PartialSH1106(serial, rotate=2)
             print(f"✓ Display initialized: {self.device.width}x{self.device.height}")
         except Exception as e:
             print(f"✗ Display init failed: {e}")
@@ -53,11 +70,53 @@ class DisplayTest:
         except:
             self.font = None
         
+        # Checkerboard test frame, drawn once and sent straight to the device
+        self._test_pattern = Image.new(self.device.mode, self.device.size, "black")
+        draw = ImageDraw.Draw(self._test_pattern)
+        for x in range(0, 128, 8):
+            for y in range(0, 64, 8):
+                if (x + y) % 16 == 0:
+                    draw.rectangle((x, y, x+8, y+8), fill="white")
+        
+        # Text that never changes on each screen, drawn once
+        self._static = [Image.new(self.device.mode, self.device.size) for _ in range(4)]
+        draw = ImageDraw.Draw(self._static[0])
+        draw.text((10, 0), "WAVESHARE HAT", font=self.font, fill="white")
+        draw.text((15, 15), "POLLING MODE", font=self.font, fill="white")
+        draw.text((5, 30), "128x64 OLED", font=self.font, fill="white")
+        draw.text((0, 45), "Use <- -> navigate", font=self.font, fill="white")
+        ImageDraw.Draw(self._static[1]).text((0, 0), "=== SYSTEM INFO ===", font=self.font, fill="white")
+        ImageDraw.Draw(self._static[2]).text((0, 0), "=== BUTTON TEST ===", font=self.font, fill="white")
+        ImageDraw.Draw(self._static[3]).text((0, 0), "== JOYSTICK TEST ==", font=self.font, fill="white")
+        
+        self._text_cache = {}
+        # One frame buffer every screen is composed in, reused each redraw
+        self._img = Image.new(self.device.mode, self.device.size)
+        self._draw = ImageDraw.Draw(self._img)
+        self._black_img = Image.new(self.device.mode, self.device.size, "black")
+        # Multiline spacing that keeps the 12px/10px line pitch of screens 2 and 3
+        line_height = self._draw.textbbox((0, 0), "A", font=self.font)[3]
+        self._spacing_12 = 12 - line_height
+        self._spacing_10 = 10 - line_height
+        self._ip_cache = (None, 0.0)  # (ip_address, time.monotonic() when resolved)
+        
         self.button_presses = {k: 0 for k in ['KEY1','KEY2','KEY3','UP','DOWN','LEFT','RIGHT','PRESS']}
         self.last_button = "None"
+        self._last_press = {}  # Button name -> time.monotonic() of its last accepted press
         self.current_screen = 0
         self.test_counter = 0
         
+        # Screen is only redrawn when something it shows has changed
+        self._dirty = True
+        self._last_sec = None  # Whole second the clock on screen 1 last showed
+        
+        # Screens are drawn on a worker thread so SPI writes never delay the
+        # 50Hz poll; holds at most one pending screen index (None stops it)
+        self._render_q = queue.Queue(maxsize=1)
+        self._screens = [self.draw_screen_0, self.draw_screen_1,
+                         self.draw_screen_2, self.draw_screen_3]
+        self._last_rendered = None  # (screen, values...) currently on the display
+        
         # Button state tracking for polling
         self.button_states = {}
         self.pin_map = {
@@ -71,12 +130,15 @@ class DisplayTest:
             JOYSTICK_PRESS: 'PRESS'
         }
         
-        # Initialize button states
-        for pin in self.pin_map.keys():
-            try:
-                self.button_states[pin] = GPIO.input(pin)
-            except:
-                self.button_states[pin] = 1  # Default to high (not pressed)
+        # Initialize button states (only pins that passed GPIO.setup are polled)
+        for pin in self._pins:
+            self.button_states[pin] = GPIO.input(pin)
+        
+        # Button bits of GPLEV0, and their levels at the last poll
+        self._pin_mask = sum(1 << pin for pin in self._pins)
+        self._levels = self._pin_mask
+        if self._gpiomem is not None:
+            self._levels = struct.unpack_from("<I", self._gpiomem, GPLEV0_OFFSET)[0] & self._pin_mask
     
     def setup_buttons(self):
         GPIO.setmode(GPIO.BCM)
@@ -85,32 +147,64 @@ class DisplayTest:
         pins = [KEY1_PIN, KEY2_PIN, KEY3_PIN, JOYSTICK_UP, JOYSTICK_DOWN, 
                 JOYSTICK_LEFT, JOYSTICK_RIGHT, JOYSTICK_PRESS]
         
+        # Pins that configured successfully, the only ones poll_buttons reads
+        self._pins = []
+        
         for pin in pins:
             try:
                 GPIO.setup(pin, GPIO.IN, pull_up_down=GPIO.PUD_UP)
                 print(f"✓ GPIO {pin} configured")
+                self._pins.append(pin)
             except Exception as e:
                 print(f"✗ GPIO {pin} setup failed: {e}")
         
         print("✓ All buttons configured for POLLING (no edge detection needed)")
+        
+        # One register read covers all 8 buttons where /dev/gpiomem is
+        # available (Pi 1-4); otherwise fall back to GPIO.input per pin
+        self._gpiomem = None
+        try:
+            fd = os.open("/dev/gpiomem", os.O_RDONLY | os.O_SYNC)
+            try:
+                self._gpiomem = mmap.mmap(fd, 4096, mmap.MAP_SHARED, mmap.PROT_READ)
+            finally:
+                os.close(fd)
+            print("✓ Button levels read from /dev/gpiomem")
+        except OSError as e:
+            print(f"✗ /dev/gpiomem unavailable, reading pins one at a time: {e}")
     
     def poll_buttons(self):
         """Poll button states manually (no interrupts)"""
-        for pin, name in self.pin_map.items():
-            try:
-                current_state = GPIO.input(pin)
-                previous_state = self.button_states.get(pin, 1)
-                
-                # Detect falling edge (button press)
-                if previous_state == 1 and current_state == 0:
-                    self.handle_button_press(name)
-                
-                self.button_states[pin] = current_state
-            except:
-                pass  # Ignore errors on individual pins
+        if self._gpiomem is not None:
+            levels = struct.unpack_from("<I", self._gpiomem, GPLEV0_OFFSET)[0] & self._pin_mask
+            # Nothing moved since the last poll, the usual case
+            if levels == self._levels:
+                return
+            # Buttons that were high at the last poll and are low now
+            pressed = self._levels & ~levels
+            self._levels = levels
+            while pressed:
+                bit = pressed & -pressed
+                self.handle_button_press(self.pin_map[bit.bit_length() - 1])
+                pressed ^= bit
+            return
+        
+        for pin in self._pins:
+            current_state = GPIO.input(pin)
+            
+            # Detect falling edge (button press)
+            if self.button_states[pin] == 1 and current_state == 0:
+                self.handle_button_press(self.pin_map[pin])
+            
+            self.button_states[pin] = current_state
     
     def handle_button_press(self, btn):
         """Handle button press events"""
+        now = time.monotonic()
+        if now - self._last_press.get(btn, 0) < DEBOUNCE_S:
+            return
+        self._last_press[btn] = now
+        
         self.button_presses[btn] += 1
         self.last_button = btn
         
@@ -126,52 +220,88 @@ class DisplayTest:
             self.test_counter = 0
         
         print(f"Button: {btn} (Total: {self.button_presses[btn]})")
+        self._dirty = True
     
     def clear_display(self):
-        with canvas(self.device) as draw:
-            draw.rectangle(self.device.bounding_box, outline="black", fill="black")
+        # Pages that are already blank are skipped by PartialSH1106
+        self.device.display(self._black_img)
+    
+    def _text(self, draw, xy, text, spacing=4):
+        """Stamp a cached 1-bit rendering of a text line (or \n-separated block)"""
+        mask = self._text_cache.get((text, spacing))
+        if mask is None:
+            if len(self._text_cache) >= TEXT_CACHE_SIZE:
+                self._text_cache.clear()
+            _, _, right, bottom = draw.textbbox((0, 0), text, font=self.font, spacing=spacing)
+            mask = Image.new("1", (right, bottom))
+            ImageDraw.Draw(mask).text((0, 0), text, font=self.font, fill="white", spacing=spacing)
+            self._text_cache[(text, spacing)] = mask
+        draw.bitmap(xy, mask, fill="white")
+    
+    def _unchanged(self, *values):
+        """True if this screen and its values are already on the display"""
+        if values == self._last_rendered:
+            return True
+        self._last_rendered = values
+        return False
     
     def draw_screen_0(self):
-        with canvas(self.device) as draw:
-            draw.text((10, 0), "WAVESHARE HAT", font=self.font, fill="white")
-            draw.text((15, 15), "POLLING MODE", font=self.font, fill="white")
-            draw.text((5, 30), "128x64 OLED", font=self.font, fill="white")
-            draw.text((0, 45), "Use <- -> navigate", font=self.font, fill="white")
+        if self._unchanged(0):
+            return
+        self.device.display(self._static[0])
+    
+    def get_ip(self):
+        """Get the device's IP address, cached for IP_CACHE_TTL seconds"""
+        ip, resolved_at = self._ip_cache
+        if ip is not None and time.monotonic() - resolved_at < self.IP_CACHE_TTL:
+            return ip
+        
+        import socket
+        try:
+            s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            s.connect(("8.8.8.8", 80))
+            ip = s.getsockname()[0]
+            s.close()
+        except:
+            ip = "N/A"
+        self._ip_cache = (ip, time.monotonic())
+        return ip
     
     def draw_screen_1(self):
-        with canvas(self.device) as draw:
-            draw.text((0, 0), "=== SYSTEM INFO ===", font=self.font, fill="white")
-            import socket
-            try:
-                s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-                s.connect(("8.8.8.8", 80))
-                ip = s.getsockname()[0]
-                s.close()
-            except:
-                ip = "N/A"
-            draw.text((0, 15), f"IP: {ip}", font=self.font, fill="white")
-            draw.text((0, 28), f"Time: {datetime.now().strftime('%H:%M:%S')}", font=self.font, fill="white")
-            draw.text((0, 41), f"Counter: {self.test_counter}", font=self.font, fill="white")
-            draw.text((0, 54), f"Screen: {self.current_screen + 1}/4", font=self.font, fill="white")
+        ip = self.get_ip()
+        now_str = datetime.now().strftime('%H:%M:%S')
+        if self._unchanged(1, ip, now_str, self.test_counter):
+            return
+        self._img.paste(self._static[1])
+        draw = self._draw
+        self._text(draw, (0, 15), f"IP: {ip}")
+        self._text(draw, (0, 28), f"Time: {now_str}")
+        self._text(draw, (0, 41), f"Counter: {self.test_counter}")
+        self._text(draw, (0, 54), "Screen: 2/4")
+        self.device.display(self._img)
     
     def draw_screen_2(self):
-        with canvas(self.device) as draw:
-            draw.text((0, 0), "=== BUTTON TEST ===", font=self.font, fill="white")
-            draw.text((0, 12), f"Last: {self.last_button}", font=self.font, fill="white")
-            y = 25
-            for btn in ['KEY1', 'KEY2', 'KEY3']:
-                count = self.button_presses[btn]
-                draw.text((0, y), f"{btn}: {count}", font=self.font, fill="white")
-                y += 12
+        if self._unchanged(2, self.last_button, self.button_presses['KEY1'],
+                           self.button_presses['KEY2'], self.button_presses['KEY3']):
+            return
+        self._img.paste(self._static[2])
+        draw = self._draw
+        self._text(draw, (0, 12), f"Last: {self.last_button}")
+        lines = "\n".join(f"{btn}: {self.button_presses[btn]}" for btn in ['KEY1', 'KEY2', 'KEY3'])
+        self._text(draw, (0, 25), lines, self._spacing_12)
+        self.device.display(self._img)
     
     def draw_screen_3(self):
-        with canvas(self.device) as draw:
-            draw.text((0, 0), "== JOYSTICK TEST ==", font=self.font, fill="white")
-            y = 12
-            for btn in ['UP', 'DOWN', 'LEFT', 'RIGHT', 'PRESS']:
-                count = self.button_presses[btn]
-                draw.text((0, y), f"{btn}: {count}", font=self.font, fill="white")
-                y += 10
+        if self._unchanged(3, self.button_presses['UP'], self.button_presses['DOWN'],
+                           self.button_presses['LEFT'], self.button_presses['RIGHT'],
+                           self.button_presses['PRESS']):
+            return
+        self._img.paste(self._static[3])
+        draw = self._draw
+        lines = "\n".join(f"{btn}: {self.button_presses[btn]}"
+                          for btn in ['UP', 'DOWN', 'LEFT', 'RIGHT', 'PRESS'])
+        self._text(draw, (0, 12), lines, self._spacing_10)
+        self.device.display(self._img)
     
     def run_test(self):
         print("\nDisplay Test Running (POLLING MODE)")
@@ -180,60 +310,74 @@ class DisplayTest:
         print("          PRESS to reset, KEY1/2/3 to test, Ctrl+C to exit")
         print()
         
+        render_thread = threading.Thread(target=self._render_worker, daemon=True)
+        render_thread.start()
+        
         try:
             print("Testing display patterns...")
-            with canvas(self.device) as draw:
-                draw.rectangle(self.device.bounding_box, outline="white", fill="white")
+            self._draw.rectangle(self.device.bounding_box, outline="white", fill="white")
+            self.device.display(self._img)
             time.sleep(0.5)
             self.clear_display()
             time.sleep(0.5)
-            with canvas(self.device) as draw:
-                for x in range(0, 128, 8):
-                    for y in range(0, 64, 8):
-                        if (x + y) % 16 == 0:
-                            draw.rectangle((x, y, x+8, y+8), fill="white")
+            self.device.display(self._test_pattern)
             time.sleep(0.5)
             print("✓ Display pattern test complete. You should see content now!")
             print("✓ Buttons are being polled - try pressing them!")
             print()
             
-            frame_count = 0
-            last_poll = time.time()
-            last_display_update = time.time()
+            # Monotonic deadlines, so NTP clock steps can't stall or rush the loop
+            next_poll = time.monotonic()
+            next_draw = time.monotonic()
             
             while True:
-                current_time = time.time()
+                now = time.monotonic()
                 
                 # Poll buttons at 50Hz (every 20ms)
-                if current_time - last_poll >= 0.02:
+                if now >= next_poll:
                     self.poll_buttons()
-                    last_poll = current_time
+                    next_poll = now + 0.02
                 
                 # Update display at 10Hz (every 100ms)
-                if current_time - last_display_update >= 0.1:
-                    if self.current_screen == 0:
-                        self.draw_screen_0()
-                    elif self.current_screen == 1:
-                        self.draw_screen_1()
-                    elif self.current_screen == 2:
-                        self.draw_screen_2()
-                    elif self.current_screen == 3:
-                        self.draw_screen_3()
+                if now >= next_draw:
+                    # Screen 1 shows the clock, so it also changes every second
+                    current_sec = int(time.time())
+                    if self.current_screen == 1 and current_sec != self._last_sec:
+                        self._last_sec = current_sec
+                        self._dirty = True
                     
-                    last_display_update = current_time
+                    if self._dirty:
+                        # If a redraw is still pending, stay dirty and retry next tick
+                        try:
+                            self._render_q.put_nowait(self.current_screen)
+                            self._dirty = False
+                        except queue.Full:
+                            pass
+                    
+                    next_draw = now + 0.1
                 
-                # Small sleep to prevent CPU spinning
-                time.sleep(0.005)
+                # Sleep until whichever of the two is due next
+                time.sleep(max(0, min(next_poll, next_draw) - time.monotonic()))
                 
         except KeyboardInterrupt:
             print("\nTest stopped by user")
+            self._render_q.put(None)
+            render_thread.join()
             self.cleanup()
     
+    def _render_worker(self):
+        """Draw each screen index the main loop queues, until it queues None"""
+        while True:
+            screen = self._render_q.get()
+            if screen is None:
+                break
+            self._screens[screen]()
+    
     def cleanup(self):
         print("Cleaning up...")
-        with canvas(self.device) as draw:
-            draw.rectangle(self.device.bounding_box, outline="black", fill="black")
-            draw.text((20, 25), "Test Complete", font=self.font, fill="white")
+        self._draw.rectangle(self.device.bounding_box, outline="black", fill="black")
+        self._draw.text((20, 25), "Test Complete", font=self.font, fill="white")
+        self.device.display(self._img)
         time.sleep(1)
         self.clear_display()
         GPIO.cleanup()
@@ -8,14 +8,15 @@ Waveshare 1.3" OLED HAT Display Test for Raspberry Pi 3 Model B v1.2
 
 import time
 import sys
+import threading
 from datetime import datetime
 
 try:
     import RPi.GPIO as GPIO
     from luma.core.interface.serial import spi
     from luma.core.render import canvas
-    from luma.oled.device import sh1106
-    from PIL import ImageFont
+    from oled_display import PartialSH1106, SPI_SPEED_HZ
+    from PIL import Image, ImageDraw, ImageFont
 except ImportError as e:
     print(f"Error importing required libraries: {e}")
     print("\nPlease install required packages:")
@@ -39,6 +40,25 @@ SPI_CS = 8
 DC_PIN = 24
 RST_PIN = 25
 
+# Checkerboard test frame, built on first use and reused afterwards
+_TEST_PATTERN = None
+
+def get_test_pattern(device):
+    """Return the cached checkerboard image for this device"""
+    global _TEST_PATTERN
+    if _TEST_PATTERN is None:
+        _TEST_PATTERN = Image.new(device.mode, device.size, "black")
+        draw = ImageDraw.Draw(_TEST_PATTERN)
+        for x in range(0, 128, 8):
+            for y in range(0, 64, 8):
+                if (x + y) % 16 == 0:
+                    draw.rectangle((x, y, x+8, y+8), fill="white")
+    return _TEST_PATTERN
+
+# Edge lockout after a press (ms); long enough for contact bounce, short
+# enough not to swallow quick repeated taps
+BOUNCE_MS = 10
+
 class DisplayTest:
     def __init__(self):
         # Initialize GPIO FIRST, before display
@@ -47,8 +67,9 @@ class DisplayTest:
         
         print("Initializing display (SH1106, 4-wire SPI)...")
         try:
-            serial = spi(device=0, port=0, bus_speed_hz=8000000, dc_pin=DC_PIN, rst_pin=RST_PIN)
-            self.device = sh1106(serial, rotate=2)
+            serial = spi(device=0, port=0, bus_speed_hz=SPI_SPEED_HZ, transfer_size=4096,
+                         dc_pin=DC_PIN, rst_pin=RST_PIN)
+            self.device = PartialSH1106(serial, rotate=2)
             print(f"✓ Display initialized: {self.device.width}x{self.device.height}")
         except Exception as e:
             print(f"✗ Display init failed: {e}")
@@ -58,10 +79,25 @@ class DisplayTest:
         except:
             self.font = None
         
+        # Text that never changes on each screen, drawn once and used as the
+        # canvas background so each frame only draws its dynamic fields
+        self._screen_bg = {n: Image.new(self.device.mode, self.device.size) for n in range(4)}
+        draw = ImageDraw.Draw(self._screen_bg[0])
+        draw.text((10, 0), "WAVESHARE HAT", font=self.font, fill="white")
+        draw.text((25, 20), "RPI 3B v1.2", font=self.font, fill="white")
+        draw.text((5, 35), "128x64 OLED", font=self.font, fill="white")
+        draw.text((0, 50), "Use <- -> to navigate", font=self.font, fill="white")
+        ImageDraw.Draw(self._screen_bg[1]).text((0, 0), "=== SYSTEM INFO ===", font=self.font, fill="white")
+        ImageDraw.Draw(self._screen_bg[2]).text((0, 0), "=== BUTTON TEST ===", font=self.font, fill="white")
+        ImageDraw.Draw(self._screen_bg[3]).text((0, 0), "== JOYSTICK TEST ==", font=self.font, fill="white")
+        
         self.button_presses = {k: 0 for k in ['KEY1','KEY2','KEY3','UP','DOWN','LEFT','RIGHT','PRESS']}
         self.last_button = "None"
         self.current_screen = 0
         self.test_counter = 0
+        # Set whenever a button changes what is shown; the loop only redraws then
+        self._redraw = threading.Event()
+        self._redraw.set()
     
     def setup_buttons(self):
         print("Configuring GPIO mode and pins...")
@@ -83,7 +119,7 @@ class DisplayTest:
         print("\nAdding edge detection...")
         for pin in pins:
             try:
-                GPIO.add_event_detect(pin, GPIO.FALLING, callback=self.button_callback, bouncetime=200)
+                GPIO.add_event_detect(pin, GPIO.FALLING, callback=self.button_callback, bouncetime=BOUNCE_MS)
                 print(f"✓ GPIO {pin} edge detection added")
             except Exception as e:
                 print(f"✗ GPIO {pin} edge detection failed: {e}")
@@ -110,18 +146,14 @@ class DisplayTest:
         elif btn == 'PRESS':
             self.test_counter = 0
         print(f"Button: {btn} (Total: {self.button_presses[btn]})")
+        self._redraw.set()
     def clear_display(self):
         with canvas(self.device) as draw:
             draw.rectangle(self.device.bounding_box, outline="black", fill="black")
     def draw_screen_0(self):
-        with canvas(self.device) as draw:
-            draw.text((10, 0), "WAVESHARE HAT", font=self.font, fill="white")
-            draw.text((25, 20), "RPI 3B v1.2", font=self.font, fill="white")
-            draw.text((5, 35), "128x64 OLED", font=self.font, fill="white")
-            draw.text((0, 50), "Use <- -> to navigate", font=self.font, fill="white")
+        self.device.display(self._screen_bg[0])
     def draw_screen_1(self):
-        with canvas(self.device) as draw:
-            draw.text((0, 0), "=== SYSTEM INFO ===", font=self.font, fill="white")
+        with canvas(self.device, background=self._screen_bg[1]) as draw:
             import socket
             try:
                 s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
@@ -135,8 +167,7 @@ class DisplayTest:
             draw.text((0, 41), f"Counter: {self.test_counter}", font=self.font, fill="white")
             draw.text((0, 54), f"Screen: {self.current_screen + 1}/4", font=self.font, fill="white")
     def draw_screen_2(self):
-        with canvas(self.device) as draw:
-            draw.text((0, 0), "=== BUTTON TEST ===", font=self.font, fill="white")
+        with canvas(self.device, background=self._screen_bg[2]) as draw:
             draw.text((0, 12), f"Last: {self.last_button}", font=self.font, fill="white")
             y = 25
             for btn in ['KEY1', 'KEY2', 'KEY3']:
@@ -144,8 +175,7 @@ class DisplayTest:
                 draw.text((0, y), f"{btn}: {count}", font=self.font, fill="white")
                 y += 12
     def draw_screen_3(self):
-        with canvas(self.device) as draw:
-            draw.text((0, 0), "== JOYSTICK TEST ==", font=self.font, fill="white")
+        with canvas(self.device, background=self._screen_bg[3]) as draw:
             y = 12
             for btn in ['UP', 'DOWN', 'LEFT', 'RIGHT', 'PRESS']:
                 count = self.button_presses[btn]
@@ -161,15 +191,14 @@ class DisplayTest:
             time.sleep(0.5)
             self.clear_display()
             time.sleep(0.5)
-            with canvas(self.device) as draw:
-                for x in range(0, 128, 8):
-                    for y in range(0, 64, 8):
-                        if (x + y) % 16 == 0:
-                            draw.rectangle((x, y, x+8, y+8), fill="white")
+            self.device.display(get_test_pattern(self.device))
             time.sleep(0.5)
             print("✓ Display pattern test complete. You should see content now!")
-            frame_count = 0
             while True:
+                # Only the info screen changes on its own, at each whole second
+                timeout = 1 - time.time() % 1 if self.current_screen == 1 else None
+                self._redraw.wait(timeout=timeout)
+                self._redraw.clear()
                 if self.current_screen == 0:
                     self.draw_screen_0()
                 elif self.current_screen == 1:
@@ -178,8 +207,6 @@ class DisplayTest:
                     self.draw_screen_2()
                 elif self.current_screen == 3:
                     self.draw_screen_3()
-                frame_count += 1
-                time.sleep(0.1)
         except KeyboardInterrupt:
             print("\nTest stopped by user")
             self.cleanup()
@@ -9,14 +9,18 @@ Waveshare 1.3" OLED HAT Display Test for Raspberry Pi Zero W2
 
 import time
 import sys
+import os
+import mmap
+import struct
+import threading
 from datetime import datetime
 
 try:
     import RPi.GPIO as GPIO
     from luma.core.interface.serial import spi
     from luma.core.render import canvas
-    from luma.oled.device import sh1106
-    from PIL import ImageFont
+    from oled_display import PartialSH1106, SPI_SPEED_HZ
+    from PIL import Image, ImageDraw, ImageFont
 except ImportError as e:
     print(f"Error importing required libraries: {e}")
     print("\nPlease install required packages:")
@@ -36,6 +40,12 @@ JOYSTICK_PRESS = 13
 DC_PIN = 24
 RST_PIN = 25
 
+# Byte offset of GPLEV0 (input levels of GPIO 0-31) in /dev/gpiomem
+GPLEV0_OFFSET = 0x34
+
+# Seconds between button polls; a level must hold for two polls to count
+POLL_INTERVAL_S = 0.005
+
 class DisplayTest:
     def __init__(self):
         # Initialize GPIO FIRST
@@ -44,8 +54,9 @@ class DisplayTest:
         
         print("Initializing display (SH1106, 4-wire SPI)...")
         try:
-            serial = spi(device=0, port=0, bus_speed_hz=8000000, dc_pin=DC_PIN, rst_pin=RST_PIN)
-            self.device = sh1106(serial, rotate=2)
+            serial = spi(device=0, port=0, bus_speed_hz=SPI_SPEED_HZ, transfer_size=4096,
+                         dc_pin=DC_PIN, rst_pin=RST_PIN)
+            self.device = PartialSH1106(serial, rotate=2)
             print(f"✓ Display initialized: {self.device.width}x{self.device.height}")
         except Exception as e:
             print(f"✗ Display init failed: {e}")
@@ -56,13 +67,29 @@ class DisplayTest:
         except:
             self.font = None
         
+        # Text that never changes on each screen, drawn once and used as the
+        # canvas background so each frame only draws its dynamic fields
+        self._screen_bg = {n: Image.new(self.device.mode, self.device.size) for n in range(4)}
+        draw = ImageDraw.Draw(self._screen_bg[0])
+        draw.text((10, 0), "WAVESHARE HAT", font=self.font, fill="white")
+        draw.text((10, 15), "Pi Zero W2", font=self.font, fill="white")
+        draw.text((5, 30), "128x64 OLED", font=self.font, fill="white")
+        draw.text((0, 45), "Use <- -> navigate", font=self.font, fill="white")
+        ImageDraw.Draw(self._screen_bg[1]).text((0, 0), "=== SYSTEM INFO ===", font=self.font, fill="white")
+        ImageDraw.Draw(self._screen_bg[2]).text((0, 0), "=== BUTTON TEST ===", font=self.font, fill="white")
+        ImageDraw.Draw(self._screen_bg[3]).text((0, 0), "== JOYSTICK TEST ==", font=self.font, fill="white")
+        
         self.button_presses = {k: 0 for k in ['KEY1','KEY2','KEY3','UP','DOWN','LEFT','RIGHT','PRESS']}
         self.last_button = "None"
         self.current_screen = 0
         self.test_counter = 0
         
-        # Button state tracking for polling
-        self.button_states = {}
+        # Buttons are polled on their own thread; it sets _redraw whenever a
+        # press changes what is shown, and the main loop only redraws then
+        self._redraw = threading.Event()
+        self._redraw.set()
+        self._stop = threading.Event()
+        
         self.pin_map = {
             KEY1_PIN: 'KEY1',
             KEY2_PIN: 'KEY2',
@@ -74,12 +101,11 @@ class DisplayTest:
             JOYSTICK_PRESS: 'PRESS'
         }
         
-        # Initialize button states
-        for pin in self.pin_map.keys():
-            try:
-                self.button_states[pin] = GPIO.input(pin)
-            except:
-                self.button_states[pin] = 1  # Default to high (not pressed)
+        # Button bits of GPLEV0, the raw levels seen at the last poll, and
+        # the debounced levels that presses are detected on
+        self._pin_mask = sum(1 << pin for pin in self._pins)
+        self._raw = self._read_levels()
+        self._levels = self._raw
     
     def setup_buttons(self):
         GPIO.setmode(GPIO.BCM)
@@ -88,29 +114,72 @@ class DisplayTest:
         pins = [KEY1_PIN, KEY2_PIN, KEY3_PIN, JOYSTICK_UP, JOYSTICK_DOWN, 
                 JOYSTICK_LEFT, JOYSTICK_RIGHT, JOYSTICK_PRESS]
         
+        # Pins that configured successfully, the only ones poll_buttons reads
+        self._pins = []
+        
         for pin in pins:
             try:
                 GPIO.setup(pin, GPIO.IN, pull_up_down=GPIO.PUD_UP)
                 print(f"✓ GPIO {pin} configured")
+                self._pins.append(pin)
             except Exception as e:
                 print(f"✗ GPIO {pin} setup failed: {e}")
         
         print("✓ All buttons configured for POLLING (no edge detection needed)")
+        
+        # One register read covers all 8 buttons where /dev/gpiomem is
+        # available; otherwise fall back to GPIO.input per pin
+        self._gpiomem = None
+        try:
+            fd = os.open("/dev/gpiomem", os.O_RDONLY | os.O_SYNC)
+            try:
+                self._gpiomem = mmap.mmap(fd, 4096, mmap.MAP_SHARED, mmap.PROT_READ)
+            finally:
+                os.close(fd)
+            print("✓ Button levels read from /dev/gpiomem")
+        except OSError as e:
+            print(f"✗ /dev/gpiomem unavailable, reading pins one at a time: {e}")
+    
+    def _read_levels(self):
+        """Return the button bits of GPLEV0 (high = released)"""
+        if self._gpiomem is not None:
+            return struct.unpack_from("<I", self._gpiomem, GPLEV0_OFFSET)[0] & self._pin_mask
+        
+        levels = 0
+        for pin in self._pins:
+            try:
+                if GPIO.input(pin):
+                    levels |= 1 << pin
+            except RuntimeError:
+                levels |= 1 << pin  # Treat unreadable pins as released
+        return levels
     
     def poll_buttons(self):
         """Poll button states manually (no interrupts)"""
-        for pin, name in self.pin_map.items():
-            try:
-                current_state = GPIO.input(pin)
-                previous_state = self.button_states.get(pin, 1)
-                
-                # Detect falling edge (button press)
-                if previous_state == 1 and current_state == 0:
-                    self.handle_button_press(name)
-                
-                self.button_states[pin] = current_state
-            except:
-                pass  # Ignore errors on individual pins
+        raw = self._read_levels()
+        # Pins whose last two samples agree take that level; bouncing pins
+        # keep their debounced level until they settle
+        settled = ~(raw ^ self._raw) & self._pin_mask
+        self._raw = raw
+        levels = (self._levels & ~settled) | (raw & settled)
+        # Nothing moved since the last poll, the usual case
+        if levels == self._levels:
+            return
+        # Buttons that were released and are now held down
+        pressed = self._levels & ~levels
+        self._levels = levels
+        while pressed:
+            bit = pressed & -pressed
+            self.handle_button_press(self.pin_map[bit.bit_length() - 1])
+            pressed ^= bit
+    
+    def _poll_loop(self):
+        """Poll the buttons every POLL_INTERVAL_S until _stop is set"""
+        next_poll = time.monotonic()
+        while not self._stop.is_set():
+            self.poll_buttons()
+            next_poll += POLL_INTERVAL_S
+            self._stop.wait(max(0, next_poll - time.monotonic()))
     
     def handle_button_press(self, btn):
         """Handle button press events"""
@@ -129,21 +198,17 @@ class DisplayTest:
             self.test_counter = 0
         
         print(f"Button: {btn} (Total: {self.button_presses[btn]})")
+        self._redraw.set()
     
     def clear_display(self):
         with canvas(self.device) as draw:
             draw.rectangle(self.device.bounding_box, outline="black", fill="black")
     
     def draw_screen_0(self):
-        with canvas(self.device) as draw:
-            draw.text((10, 0), "WAVESHARE HAT", font=self.font, fill="white")
-            draw.text((10, 15), "Pi Zero W2", font=self.font, fill="white")
-            draw.text((5, 30), "128x64 OLED", font=self.font, fill="white")
-            draw.text((0, 45), "Use <- -> navigate", font=self.font, fill="white")
+        self.device.display(self._screen_bg[0])
     
     def draw_screen_1(self):
-        with canvas(self.device) as draw:
-            draw.text((0, 0), "=== SYSTEM INFO ===", font=self.font, fill="white")
+        with canvas(self.device, background=self._screen_bg[1]) as draw:
             import socket
             try:
                 s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
@@ -158,8 +223,7 @@ class DisplayTest:
             draw.text((0, 54), f"Screen: {self.current_screen + 1}/4", font=self.font, fill="white")
     
     def draw_screen_2(self):
-        with canvas(self.device) as draw:
-            draw.text((0, 0), "=== BUTTON TEST ===", font=self.font, fill="white")
+        with canvas(self.device, background=self._screen_bg[2]) as draw:
             draw.text((0, 12), f"Last: {self.last_button}", font=self.font, fill="white")
             y = 25
             for btn in ['KEY1', 'KEY2', 'KEY3']:
@@ -168,8 +232,7 @@ class DisplayTest:
                 y += 12
     
     def draw_screen_3(self):
-        with canvas(self.device) as draw:
-            draw.text((0, 0), "== JOYSTICK TEST ==", font=self.font, fill="white")
+        with canvas(self.device, background=self._screen_bg[3]) as draw:
             y = 12
             for btn in ['UP', 'DOWN', 'LEFT', 'RIGHT', 'PRESS']:
                 count = self.button_presses[btn]
@@ -188,53 +251,53 @@ class DisplayTest:
         print("  Ctrl+C      - Exit test")
         print("\n" + "="*60 + "\n")
         
+        poll_thread = threading.Thread(target=self._poll_loop, daemon=True)
+        
         try:
             print("Testing display patterns...")
-            with canvas(self.device) as draw:
-                draw.rectangle(self.device.bounding_box, outline="white", fill="white")
+            # Build each test frame once and push it straight to the device
+            white_img = Image.new(self.device.mode, self.device.size, "white")
+            black_img = Image.new(self.device.mode, self.device.size, "black")
+            pattern_img = Image.new(self.device.mode, self.device.size, "black")
+            draw = ImageDraw.Draw(pattern_img)
+            for x in range(0, 128, 8):
+                for y in range(0, 64, 8):
+                    if (x + y) % 16 == 0:
+                        draw.rectangle((x, y, x+8, y+8), fill="white")
+            
+            self.device.display(white_img)
             time.sleep(0.5)
-            self.clear_display()
+            self.device.display(black_img)
             time.sleep(0.5)
-            with canvas(self.device) as draw:
-                for x in range(0, 128, 8):
-                    for y in range(0, 64, 8):
-                        if (x + y) % 16 == 0:
-                            draw.rectangle((x, y, x+8, y+8), fill="white")
+            self.device.display(pattern_img)
             time.sleep(0.5)
             print("✓ Display pattern test complete. You should see content now!")
             print("✓ Buttons are being polled - try pressing them!")
             print()
             
-            frame_count = 0
-            last_poll = time.time()
-            last_display_update = time.time()
+            poll_thread.start()
             
             while True:
-                current_time = time.time()
-                
-                # Poll buttons at 50Hz (every 20ms)
-                if current_time - last_poll >= 0.02:
-                    self.poll_buttons()
-                    last_poll = current_time
-                
-                # Update display at 10Hz (every 100ms)
-                if current_time - last_display_update >= 0.1:
-                    if self.current_screen == 0:
-                        self.draw_screen_0()
-                    elif self.current_screen == 1:
-                        self.draw_screen_1()
-                    elif self.current_screen == 2:
-                        self.draw_screen_2()
-                    elif self.current_screen == 3:
-                        self.draw_screen_3()
-                    
-                    last_display_update = current_time
+                # Only the info screen changes on its own, at each whole second
+                timeout = 1 - time.time() % 1 if self.current_screen == 1 else None
+                self._redraw.wait(timeout=timeout)
+                self._redraw.clear()
                 
-                # Small sleep to prevent CPU spinning
-                time.sleep(0.005)
+                if self.current_screen == 0:
+                    self.draw_screen_0()
+                elif self.current_screen == 1:
+                    self.draw_screen_1()
+                elif self.current_screen == 2:
+                    self.draw_screen_2()
+                elif self.current_screen == 3:
+                    self.draw_screen_3()
                 
         except KeyboardInterrupt:
             print("\nTest stopped by user")
+            self._stop.set()
+            # GPIO.cleanup releases the pins, so the poll thread must be done with them
+            if poll_thread.is_alive():
+                poll_thread.join(timeout=1)
             self.cleanup()
     
     def cleanup(self):
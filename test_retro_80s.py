@@ -326,14 +326,17 @@ class Retro80sAnimation:
         # Define CONNECT in a bitmap pattern
         # Each row is 8 pixels tall, we'll draw it column by column
         
+        # Render the full dot pattern once; each frame stamps the revealed part
+        dots = Image.new("1", (128, 64))
+        ImageDraw.Draw(dots).point(
+            [(x, y) for x in range(0, 128, 4) for y in range(0, 64, 4) if (x + y) % 8 == 0],
+            fill=1)
+        
         for col in range(128):
             with canvas(self.device) as draw:
                 # Draw columns revealed so far
-                # Just fill with pattern as we go
-                for x in range(0, col, 4):
-                    for y in range(0, 64, 4):
-                        if (x + y) % 8 == 0:
-                            draw.point((x, y), fill="white")
+                if col > 0:
+                    draw.bitmap((0, 0), dots.crop((0, 0, col, 64)), fill="white")
                 
                 # Show CONNECT text as it's revealed
                 if col > 20: